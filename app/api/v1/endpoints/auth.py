@@ -2,11 +2,11 @@
 Authentication endpoints.
 """
 from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.auth import LoginRequest, Token, GoogleAuthRequest, AuthResponse, UserProfile
 from app.services.google_auth_service import GoogleAuthService, GoogleAuthError
-from app.core.database import get_db_session
+from app.core.database import get_async_db_session
 from app.core.config import settings
 
 router = APIRouter()
@@ -35,7 +35,7 @@ async def login(request: LoginRequest):
 
 
 @router.post("/google", response_model=AuthResponse)
-async def google_auth(request: GoogleAuthRequest, db: Session = Depends(get_db_session)):
+async def google_auth(request: GoogleAuthRequest, db: AsyncSession = Depends(get_async_db_session)):
     """Google OAuth authentication endpoint."""
     try:
         # Initialize Google Auth service
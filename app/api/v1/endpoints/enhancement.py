@@ -2,12 +2,17 @@
 Enhancement endpoints matching OpenAPI specification.
 Two-stage flow: POST creates enhancement (text), GET retrieves audio.
 """
+import os
 import uuid
+from functools import lru_cache
+from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, Path, Depends
-from sqlalchemy.orm import Session
-from app.services.gemini_service import GeminiService, GeminiError
-from app.services.tts_service import TTSService, TTSError
-from app.core.database import get_db_session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.gemini_service import GeminiService, GeminiError, GeminiRateLimitError
+from app.services.tts_service import TTSService, TTSError, TTSRateLimitError
+from app.core.database import get_async_db_session
 from app.core.auth import get_user_id_or_anonymous
 from app.models.enhancement import Enhancement
 from app.schemas.enhancement import (
@@ -18,11 +23,39 @@ from app.schemas.enhancement import (
 
 router = APIRouter()
 
+
+@lru_cache(maxsize=1)
+def _shared_gemini_service(api_key: Optional[str], model: Optional[str]) -> GeminiService:
+    """Build one GeminiService per configured key and model; it keeps no per-request state."""
+    return GeminiService(api_key=api_key, model=model)
+
+
+def get_gemini_service() -> Optional[GeminiService]:
+    """Get the Gemini service dependency (overridable via app.dependency_overrides).
+    
+    Returns None when the service can't be configured (e.g. missing GEMINI_API_KEY);
+    dependencies run before body validation, so failing here would mask 422s.
+    """
+    try:
+        return _shared_gemini_service(os.getenv("GEMINI_API_KEY"), os.getenv("GEMINI_MODEL"))
+    except GeminiError as e:
+        print(f"❌ GeminiError: {e}")
+        return None
+
+
+def _require_gemini_service(gemini_service: Optional[GeminiService]) -> GeminiService:
+    """Raise GeminiError (mapped to 503 by the endpoints) if Gemini isn't configured."""
+    if gemini_service is None:
+        raise GeminiError("Gemini service is not configured")
+    return gemini_service
+
+
 @router.post("", response_model=EnhancementTextResponse)
 async def create_enhancement(
     request: EnhancementRequest, 
-    db: Session = Depends(get_db_session),
-    user_id: str = Depends(get_user_id_or_anonymous)
+    db: AsyncSession = Depends(get_async_db_session),
+    user_id: str = Depends(get_user_id_or_anonymous),
+    gemini_service: Optional[GeminiService] = Depends(get_gemini_service)
 ):
     """Create enhancement (Stage 1 - Text).
     
@@ -34,11 +67,8 @@ async def create_enhancement(
         # Generate unique enhancement ID
         enhancement_id = f"enh_{uuid.uuid4().hex[:12]}"
         
-        # Initialize Gemini service
-        gemini_service = GeminiService()
-        
         # Enhance story with photo analysis
-        enhancement_result = await gemini_service.enhance_story_with_photo(
+        enhancement_result = await _require_gemini_service(gemini_service).enhance_story_with_photo(
             photo_base64=request.photo_base64,
             transcript=request.transcript,
             language=request.language
@@ -57,12 +87,12 @@ async def create_enhancement(
             )
             
             db.add(enhancement)
-            db.commit()
-            db.refresh(enhancement)
+            await db.commit()
+            await db.refresh(enhancement)
             print(f"✅ Enhancement saved to database: {enhancement_id}")
             
         except Exception as db_error:
-            db.rollback()
+            await db.rollback()
             print(f"⚠️ Database save failed: {db_error}")
             # Continue without database persistence for now
         
@@ -74,12 +104,9 @@ async def create_enhancement(
     except GeminiError as e:
         # Handle specific Gemini service errors
         print(f"❌ GeminiError: {e}")
-        if "API key" in str(e):
-            raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
-        elif "rate limit" in str(e).lower():
+        if isinstance(e, GeminiRateLimitError):
             raise HTTPException(status_code=429, detail="Too many requests, please try again later")
-        else:
-            raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
     except Exception as e:
         print(f"❌ Enhancement error: {e}")
         print(f"❌ Error type: {type(e)}")
@@ -87,11 +114,50 @@ async def create_enhancement(
         print(f"❌ Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/stream")
+async def create_enhancement_stream(
+    request: EnhancementRequest,
+    user_id: str = Depends(get_user_id_or_anonymous),
+    gemini_service: Optional[GeminiService] = Depends(get_gemini_service)
+):
+    """Stream the enhanced transcript as plain text while Gemini generates it.
+
+    Lets the client render the story progressively. Nothing is persisted;
+    use POST /api/v1/enhancements for the stored two-stage flow.
+    """
+    try:
+        fragments = _require_gemini_service(gemini_service).enhance_story_with_photo_stream(
+            photo_base64=request.photo_base64,
+            transcript=request.transcript,
+            language=request.language
+        )
+        # Wait for the first fragment so failures still map to an HTTP status
+        first_fragment = await fragments.__anext__()
+    except StopAsyncIteration:
+        first_fragment = ""
+    except GeminiRateLimitError as e:
+        print(f"❌ GeminiError: {e}")
+        raise HTTPException(status_code=429, detail="Too many requests, please try again later")
+    except GeminiError as e:
+        print(f"❌ GeminiError: {e}")
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
+
+    async def stream_transcript():
+        yield first_fragment
+        try:
+            async for fragment in fragments:
+                yield fragment
+        except GeminiError as e:
+            # Headers are already sent; end the stream early
+            print(f"❌ GeminiError during stream: {e}")
+
+    return StreamingResponse(stream_transcript(), media_type="text/plain; charset=utf-8")
+
 @router.get("", response_model=EnhancementHistoryResponse)
 async def get_enhancements(
     limit: int = Query(default=20, ge=1, le=50),
     offset: int = Query(default=0, ge=0),
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     user_id: str = Depends(get_user_id_or_anonymous)
 ):
     """Get enhancement history.
@@ -100,14 +166,18 @@ async def get_enhancements(
     """
     try:
         # Query enhancements with pagination (filtered by user)
-        total_count = db.query(Enhancement).filter(Enhancement.user_id == user_id).count()
+        total_count = await db.scalar(
+            select(func.count()).select_from(Enhancement).where(Enhancement.user_id == user_id)
+        )
         
-        enhancements = db.query(Enhancement)\
-            .filter(Enhancement.user_id == user_id)\
-            .order_by(Enhancement.created_at.desc())\
-            .offset(offset)\
-            .limit(limit)\
-            .all()
+        result = await db.execute(
+            select(Enhancement)
+            .where(Enhancement.user_id == user_id)
+            .order_by(Enhancement.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+        enhancements = result.scalars().all()
         
         # Convert to response format
         items = []
@@ -140,7 +210,7 @@ async def get_enhancements(
 @router.get("/{enhancement_id}", response_model=EnhancementDetails)
 async def get_enhancement_by_id(
     enhancement_id: str = Path(..., pattern=r"^enh_[a-zA-Z0-9]+$"),
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     user_id: str = Depends(get_user_id_or_anonymous)
 ):
     """Get enhancement details.
@@ -149,10 +219,10 @@ async def get_enhancement_by_id(
     """
     try:
         # Query enhancement by ID and user
-        enhancement = db.query(Enhancement).filter(
+        enhancement = await db.scalar(select(Enhancement).where(
             Enhancement.enhancement_id == enhancement_id,
             Enhancement.user_id == user_id
-        ).first()
+        ))
         
         if not enhancement:
             raise HTTPException(status_code=404, detail="Enhancement not found")
@@ -177,7 +247,7 @@ async def get_enhancement_by_id(
 @router.get("/{enhancement_id}/audio", response_model=EnhancementAudioResponse)
 async def get_enhancement_audio(
     enhancement_id: str = Path(..., pattern=r"^enh_[a-zA-Z0-9]+$"),
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     user_id: str = Depends(get_user_id_or_anonymous)
 ):
     """Generate or retrieve audio (Stage 2 - Audio).
@@ -188,10 +258,10 @@ async def get_enhancement_audio(
     """
     try:
         # Get enhancement from database
-        enhancement = db.query(Enhancement).filter(
+        enhancement = await db.scalar(select(Enhancement).where(
             Enhancement.enhancement_id == enhancement_id,
             Enhancement.user_id == user_id
-        ).first()
+        ))
         
         if not enhancement:
             raise HTTPException(status_code=404, detail="Enhancement not found")
@@ -209,11 +279,11 @@ async def get_enhancement_audio(
         try:
             from app.models.enhancement import AudioStatusEnum
             enhancement.audio_status = AudioStatusEnum.READY
-            db.commit()
+            await db.commit()
         except Exception as db_error:
             # Log but don't fail the request if database update fails
             print(f"⚠️ Failed to update audio status: {db_error}")
-            db.rollback()
+            await db.rollback()
         
         return EnhancementAudioResponse(
             audio_base64=audio_base64,
@@ -222,15 +292,74 @@ async def get_enhancement_audio(
         
     except TTSError as e:
         # Handle specific TTS service errors
-        if "quota" in str(e).lower() or "limit" in str(e).lower():
+        if isinstance(e, TTSRateLimitError):
             raise HTTPException(status_code=429, detail="TTS service quota exceeded, please try again later")
-        elif "credentials" in str(e).lower() or "authentication" in str(e).lower():
-            raise HTTPException(status_code=503, detail="TTS service temporarily unavailable")
-        else:
-            raise HTTPException(status_code=503, detail="TTS service unavailable")
+        raise HTTPException(status_code=503, detail="TTS service unavailable")
     except HTTPException:
         # Re-raise HTTP exceptions (like 404)
         raise
     except Exception as e:
         print(f"❌ Audio generation error: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/{enhancement_id}/audio/stream")
+async def stream_enhancement_audio(
+    enhancement_id: str = Path(..., pattern=r"^enh_[a-zA-Z0-9]+$"),
+    db: AsyncSession = Depends(get_async_db_session),
+    user_id: str = Depends(get_user_id_or_anonymous)
+):
+    """Stream audio as raw MP3 (Stage 2 - Audio, streaming variant).
+    
+    Same as GET /api/v1/enhancements/{id}/audio, but sends MP3 bytes as the TTS
+    provider produces them instead of a single base64 JSON payload.
+    """
+    try:
+        enhancement = await db.scalar(select(Enhancement).where(
+            Enhancement.enhancement_id == enhancement_id,
+            Enhancement.user_id == user_id
+        ))
+        
+        if not enhancement:
+            raise HTTPException(status_code=404, detail="Enhancement not found")
+        
+        audio_chunks = TTSService().stream_audio(
+            text=enhancement.enhanced_transcript,
+            language=enhancement.language
+        )
+        # Wait for the first chunk so failures still map to an HTTP status
+        first_chunk = await audio_chunks.__anext__()
+        
+    except StopAsyncIteration:
+        print("❌ TTS streaming error: provider returned no audio")
+        raise HTTPException(status_code=503, detail="TTS service unavailable")
+    except TTSError as e:
+        print(f"❌ TTS streaming error: {e}")
+        if isinstance(e, TTSRateLimitError):
+            raise HTTPException(status_code=429, detail="TTS service quota exceeded, please try again later")
+        raise HTTPException(status_code=503, detail="TTS service unavailable")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Audio streaming error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    async def stream_audio():
+        yield first_chunk
+        try:
+            async for chunk in audio_chunks:
+                yield chunk
+        except TTSError as e:
+            # Headers are already sent; end the stream early
+            print(f"❌ TTS streaming error: {e}")
+            return
+        
+        # Update enhancement audio status once the full file was sent
+        try:
+            from app.models.enhancement import AudioStatusEnum
+            enhancement.audio_status = AudioStatusEnum.READY
+            await db.commit()
+        except Exception as db_error:
+            print(f"⚠️ Failed to update audio status: {db_error}")
+            await db.rollback()
+    
+    return StreamingResponse(stream_audio(), media_type="audio/mpeg")
@@ -1,21 +1,26 @@
 """
 Health check endpoints.
 """
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Response
 
 router = APIRouter()
 
+# The payloads never change, so encode them once instead of on every poll
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "amplify-backend"})
+_DETAILED_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "amplify-backend",
+    "version": "1.0.0",
+    "uptime": "running"
+})
+
 @router.get("/")
 async def health_check():
     """Basic health check endpoint."""
-    return {"status": "healthy", "service": "amplify-backend"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 @router.get("/detailed")
 async def detailed_health_check():
     """Detailed health check with system information."""
-    return {
-        "status": "healthy",
-        "service": "amplify-backend",
-        "version": "1.0.0",
-        "uptime": "running"
-    }
\ No newline at end of file
+    return Response(content=_DETAILED_HEALTH_BODY, media_type="application/json")
\ No newline at end of file
@@ -3,12 +3,14 @@ Authentication utilities and dependencies for FastAPI.
 """
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+import jwt
+from jwt.exceptions import InvalidTokenError as JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.core.config import settings
-from app.core.database import get_db_session
+from app.core.database import get_async_db_session
 from app.models.user import User
 
 security = HTTPBearer(auto_error=False)
@@ -21,7 +23,7 @@ class AuthError(Exception):
 
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ) -> Optional[User]:
     """
     Get current user from JWT token (optional).
@@ -40,7 +42,7 @@ async def get_current_user_optional(
 
 async def get_current_user_required(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ) -> User:
     """
     Get current user from JWT token (required).
@@ -69,7 +71,7 @@ async def get_current_user_required(
         )
 
 
-async def verify_jwt_token(token: str, db: Session) -> Optional[User]:
+async def verify_jwt_token(token: str, db: AsyncSession) -> Optional[User]:
     """
     Verify JWT token and return user.
     
@@ -92,8 +94,7 @@ async def verify_jwt_token(token: str, db: Session) -> Optional[User]:
             return None
         
         # Get user from database
-        user = db.query(User).filter(User.user_id == user_id).first()
-        return user
+        return await db.scalar(select(User).where(User.user_id == user_id))
         
     except JWTError:
         raise
@@ -18,12 +18,17 @@ class Settings(BaseSettings):
     server_host: str = "0.0.0.0"
     server_port: int = 8000  # Use 8000 locally (5000 is often used by macOS AirPlay)
     debug: bool = True
+    anyio_threads: int = 200  # Worker threads for sync endpoints/run_in_threadpool
 
     # Security
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 43200  # 30 days (30 * 24 * 60)
 
+    # CORS
+    cors_origins: list[str] = ["*"]  # Set CORS_ORIGINS='["https://app.example"]' in production
+    cors_max_age: int = 86400  # Seconds browsers may cache preflight responses
+
     # External APIs
     gemini_api_key: Optional[str] = None
     openai_api_key: Optional[str] = None
@@ -41,6 +46,9 @@ class Settings(BaseSettings):
 
     # Database
     database_url: Optional[str] = None
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 3600  # Seconds before a pooled connection is replaced
 
     # Prompt Management
     prompts_path: str = "app/prompts"
@@ -1,8 +1,12 @@
 """
 Database initialization and session management.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from typing import Any, Dict, Optional
 import os
 from app.models.base import Base
 from app.core.config import settings
@@ -22,23 +26,58 @@ def get_database_url() -> str:
     return database_url
 
 
+def get_async_database_url() -> str:
+    """Get database URL with an asyncio driver (asyncpg/aiosqlite)."""
+    database_url = get_database_url()
+    
+    if database_url.startswith("postgresql://"):
+        database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        # asyncpg takes ssl=... instead of libpq's sslmode=...
+        database_url = database_url.replace("sslmode=", "ssl=")
+    elif database_url.startswith("sqlite://"):
+        database_url = database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    
+    return database_url
+
+
+def get_pool_options(database_url: str) -> Dict[str, Any]:
+    """Connection pool options for long-lived application engines."""
+    if database_url.startswith("sqlite"):
+        # SQLite connections are local files; pool sizing doesn't apply
+        return {"pool_pre_ping": True}
+    
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,  # Drop connections the server may have closed
+        "pool_pre_ping": True,
+    }
+
+
 def create_database_engine():
     """Create database engine."""
     database_url = get_database_url()
-    return create_engine(database_url, echo=settings.debug)
+    return create_engine(database_url, echo=settings.debug, **get_pool_options(database_url))
 
 
 def create_tables():
     """Create all database tables."""
     try:
         database_url = get_database_url()
-        engine = create_engine(database_url)
+        # One-shot DDL: don't keep idle connections around afterwards
+        engine = create_engine(database_url, poolclass=NullPool)
         
         # Import all models to ensure they are registered with Base
         from app.models import Enhancement, User
         
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create only missing tables; warm startups cost one catalog query
+        existing_tables = set(inspect(engine).get_table_names())
+        missing_tables = [
+            table for table in Base.metadata.sorted_tables
+            if table.name not in existing_tables
+        ]
+        if missing_tables:
+            Base.metadata.create_all(bind=engine, tables=missing_tables)
         
         # Create anonymous user for testing before auth is implemented
         create_anonymous_user(engine)
@@ -82,12 +121,25 @@ def create_anonymous_user(engine):
         # Don't fail the entire setup if this fails
 
 
+# Engines are created once and shared, so their connection pools are reused
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def get_session_factory() -> sessionmaker:
+    """Get (and lazily create) the shared Session factory."""
+    global _engine, _session_factory
+    if _session_factory is None:
+        database_url = get_database_url()
+        _engine = create_engine(database_url, **get_pool_options(database_url))
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _session_factory
+
+
 def get_db_session():
     """Get database session dependency for FastAPI."""
     try:
-        database_url = get_database_url()
-        engine = create_engine(database_url, pool_pre_ping=True)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        SessionLocal = get_session_factory()
         
         db = SessionLocal()
         try:
@@ -106,6 +158,37 @@ def get_db_session():
         raise
 
 
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Get (and lazily create) the shared AsyncSession factory."""
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        database_url = get_async_database_url()
+        _async_engine = create_async_engine(database_url, **get_pool_options(database_url))
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def get_async_db_session():
+    """Get async database session dependency for FastAPI."""
+    try:
+        session_factory = get_async_session_factory()
+    except ValueError as e:
+        if "DATABASE_URL environment variable is required" in str(e):
+            print(f"❌ Database session error: Database not configured")
+            raise RuntimeError("Database not configured") from e
+        print(f"❌ Database session error: {e}")
+        raise
+    
+    async with session_factory() as db:
+        yield db
+
+
 # Initialize on module import for Replit
 if __name__ == "__main__":
     create_tables()
\ No newline at end of file
@@ -2,6 +2,7 @@
 Factory for creating AI story enhancement services.
 """
 import logging
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from app.core.config import settings
 from app.services.ai_service_interface import AIStoryEnhancementService
@@ -16,6 +17,27 @@ class AIServiceError(Exception):
     pass
 
 
+@lru_cache(maxsize=16)
+def _provider_capabilities(provider: str, model: str) -> Dict[str, Any]:
+    """Build the capabilities of a provider's model (memoized per provider and model)."""
+    if provider == "gemini":
+        return {
+            "name": "gemini",
+            "supports_vision": True,
+            "model": model,
+            "description": "Google Gemini AI with vision capabilities"
+        }
+
+    vision_models = {"gpt-4-vision-preview", "gpt-4-turbo"}
+    supports_vision = model in vision_models
+    return {
+        "name": "openai",
+        "supports_vision": supports_vision,
+        "model": model,
+        "description": f"OpenAI GPT model{' with vision' if supports_vision else ''}"
+    }
+
+
 class AIServiceFactory:
     """Factory for creating and managing AI story enhancement services."""
 
@@ -147,27 +169,19 @@ class AIServiceFactory:
             AIServiceError: If provider is unknown
         """
         if provider == "gemini":
-            return {
-                "name": "gemini",
-                "supports_vision": True,
-                "model": settings.gemini_model,
-                "description": "Google Gemini AI with vision capabilities"
-            }
+            model = settings.gemini_model
         elif provider == "openai":
-            vision_models = {"gpt-4-vision-preview", "gpt-4-turbo"}
-            supports_vision = settings.openai_model in vision_models
-            return {
-                "name": "openai",
-                "supports_vision": supports_vision,
-                "model": settings.openai_model,
-                "description": f"OpenAI GPT model{' with vision' if supports_vision else ''}"
-            }
+            model = settings.openai_model
         else:
             raise AIServiceError(f"Unknown provider: {provider}")
 
+        # Copy so callers can't mutate the memoized dict
+        return dict(_provider_capabilities(provider, model))
+
     def clear_cache(self):
-        """Clear the cached service instance."""
+        """Clear the cached service instance and provider capabilities."""
         self._service_cache = None
+        _provider_capabilities.cache_clear()
         logger.info("🗑️ AI service cache cleared")
 
     def get_current_provider(self) -> Optional[str]:
@@ -2,12 +2,15 @@
 Gemini story enhancement service for analyzing photos and enhancing story transcripts.
 """
 import os
+import asyncio
 import json
 import re
-from typing import Dict, Any
-from pydantic import BaseModel, Field
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, Any
+from pydantic import BaseModel, Field, ValidationError
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from google.api_core import exceptions as google_exceptions
 import base64
 import io
 from PIL import Image
@@ -16,14 +19,113 @@ from app.services.ai_service_interface import AIStoryEnhancementService
 from app.schemas.ai_response import GeminiResponse
 
 
+# Largest side Gemini accepts without server-side downscaling
+MAX_IMAGE_DIMENSION = 3072
+
+# Markdown-fenced JSON in model output, compiled once for every response parse
+_FENCED_JSON_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL | re.MULTILINE)
+
+# Supported language codes (ISO 639-1) and their human-readable names
+_LANGUAGE_NAMES = MappingProxyType({
+    'en': 'English',
+    'es': 'Spanish',
+    'fr': 'French',
+    'de': 'German',
+    'it': 'Italian',
+    'pt': 'Portuguese',
+    'ja': 'Japanese',
+    'ko': 'Korean',
+    'zh': 'Chinese',
+    'ru': 'Russian',
+    'ar': 'Arabic',
+    'hi': 'Hindi'
+})
+_VALID_LANGUAGES = frozenset(_LANGUAGE_NAMES)
+
+
 class GeminiError(Exception):
     """Custom exception for Gemini service errors."""
     pass
 
 
+class GeminiRateLimitError(GeminiError):
+    """Raised when Gemini rejects a request for rate limit or quota reasons."""
+    pass
+
+
 # GeminiResponse is now imported from app.schemas.ai_response
 
 
+class TranscriptStreamParser:
+    """Incrementally extract the enhanced_transcript value from streamed JSON.
+
+    Gemini streams the JSON response in arbitrary text chunks. feed() returns
+    the newly completed characters of the enhanced_transcript string, so they
+    can be forwarded before the rest of the object has arrived.
+    """
+
+    _VALUE_START = re.compile(r'"enhanced_transcript"\s*:\s*"')
+    _ESCAPES = {
+        '"': '"', '\\': '\\', '/': '/',
+        'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'
+    }
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._pos = None
+
+    def feed(self, chunk: str) -> str:
+        """Add a streamed chunk and return any newly decoded transcript text."""
+        self.buffer += chunk
+        if self.done:
+            return ""
+
+        if self._pos is None:
+            match = self._VALUE_START.search(self.buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        buffer = self.buffer
+        end = len(buffer)
+        pos = self._pos
+        fragment = []
+        while pos < end:
+            char = buffer[pos]
+            if char == '"':
+                self.done = True
+                break
+            if char != '\\':
+                fragment.append(char)
+                pos += 1
+                continue
+
+            # Escape sequence; wait for more data if it is split across chunks
+            if pos + 1 >= end:
+                break
+            escape = buffer[pos + 1]
+            if escape != 'u':
+                fragment.append(self._ESCAPES.get(escape, escape))
+                pos += 2
+                continue
+            if pos + 6 > end:
+                break
+            code = int(buffer[pos + 2:pos + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate: combine with the following low surrogate
+                if pos + 12 > end:
+                    break
+                low = int(buffer[pos + 8:pos + 12], 16)
+                code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                pos += 6
+            fragment.append(chr(code))
+            pos += 6
+
+        self._pos = pos
+        return "".join(fragment)
+
+
 class GeminiService(AIStoryEnhancementService):
     """Service for story enhancement using Google's Gemini AI with vision capabilities."""
 
@@ -53,6 +155,13 @@ class GeminiService(AIStoryEnhancementService):
             HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
         }
 
+        self.generation_config = {
+            'temperature': 0.7,
+            'top_p': 0.8,
+            'top_k': 40,
+            'max_output_tokens': 2048,
+        }
+
     async def enhance_story_with_photo(self,
                                        photo_base64: str,
                                        transcript: str,
@@ -71,117 +180,152 @@ class GeminiService(AIStoryEnhancementService):
         Raises:
             GeminiError: If validation fails or API call fails
         """
-        try:
-            # Validate inputs
-            self._validate_inputs(photo_base64, transcript, language)
+        # Validate inputs
+        self._validate_inputs(photo_base64, transcript, language)
 
-            # Call Gemini API
+        # Call Gemini API
+        try:
             response = await self._call_gemini_api(photo_base64=photo_base64,
                                                    transcript=transcript,
                                                    language=language)
+        except GeminiError:
+            raise
+        except Exception as e:
+            raise GeminiError(f"Gemini API error: {str(e)}") from e
+
+        # Validate and return response
+        return self._parse_response(response)
+
+    async def enhance_story_with_photo_stream(self,
+                                              photo_base64: str,
+                                              transcript: str,
+                                              language: str = "en"
+                                              ) -> AsyncIterator[str]:
+        """
+        Stream the enhanced transcript as Gemini generates it.
+
+        Args:
+            photo_base64: Base64 encoded image data
+            transcript: Original story transcript
+            language: Language code (ISO 639-1)
+
+        Yields:
+            Fragments of the enhanced transcript, in order
+
+        Raises:
+            GeminiError: If validation fails or API call fails
+        """
+        self._validate_inputs(photo_base64, transcript, language)
 
-            # Validate and return response
-            return self._parse_response(response)
+        try:
+            image = await asyncio.to_thread(self._prepare_image, photo_base64)
+            prompt = self._build_prompt(transcript, language)
 
+            response = await self.model.generate_content_async(
+                [prompt, image],
+                safety_settings=self.safety_settings,
+                generation_config=self.generation_config,
+                stream=True)
+
+            parser = TranscriptStreamParser()
+            async for chunk in response:
+                fragment = parser.feed(chunk.text)
+                if fragment:
+                    yield fragment
+
+        except GeminiError:
+            raise
+        except google_exceptions.ResourceExhausted as e:
+            raise GeminiRateLimitError(f"Gemini rate limit exceeded: {str(e)}")
         except Exception as e:
-            if isinstance(e, GeminiError):
-                raise
-            raise GeminiError(f"Gemini API error: {str(e)}")
+            raise GeminiError(f"Gemini streaming failed: {str(e)}")
+
+        if not parser.done:
+            raise GeminiError("Invalid response format: enhanced_transcript not found")
 
     def _validate_inputs(self, photo_base64: str, transcript: str,
                          language: str) -> None:
         """Validate input parameters."""
-        if not photo_base64 or not photo_base64.strip():
+        if not photo_base64 or photo_base64.isspace():
             raise GeminiError("Photo data is required")
 
-        if not transcript or not transcript.strip():
+        if not transcript or transcript.isspace():
             raise GeminiError("Transcript is required")
 
         if len(transcript) > 5000:
             raise GeminiError("Transcript too long (max 5000 characters)")
 
         # Validate language code (ISO 639-1)
-        valid_languages = {
-            'en', 'es', 'fr', 'de', 'it', 'pt', 'ja', 'ko', 'zh', 'ru', 'ar',
-            'hi'
-        }
-        if language not in valid_languages:
+        if language not in _VALID_LANGUAGES:
             raise GeminiError(f"Invalid language code: {language}")
 
     async def _call_gemini_api(self, photo_base64: str, transcript: str,
                                language: str) -> Dict[str, Any]:
         """Make the actual API call to Gemini."""
-        try:
-            # Convert base64 to PIL Image
-            image_data = base64.b64decode(photo_base64)
-            image = Image.open(io.BytesIO(image_data))
-
-            # Convert to RGB mode to ensure compatibility with Gemini API
-            if image.mode in ('RGBA', 'LA', 'P'):
-                # Create white background for transparent images
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'P':
-                    image = image.convert('RGBA')
-                background.paste(
-                    image,
-                    mask=image.split()[-1] if image.mode in ('RGBA',
-                                                             'LA') else None)
-                image = background
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
+        # Build prompt using PromptManager
+        prompt = self._build_prompt(transcript, language)
 
-            # Build prompt using PromptManager
-            prompt = self._build_prompt(transcript, language)
+        try:
+            # Decode/convert off the event loop; PIL releases the GIL while decoding
+            image = await asyncio.to_thread(self._prepare_image, photo_base64)
 
             # Generate content with image and text
             response = self.model.generate_content(
                 [prompt, image],
                 safety_settings=self.safety_settings,
-                generation_config={
-                    'temperature': 0.7,
-                    'top_p': 0.8,
-                    'top_k': 40,
-                    'max_output_tokens': 2048,
-                })
-
-            # Parse JSON response
+                generation_config=self.generation_config)
             response_text = response.text
+        except google_exceptions.ResourceExhausted as e:
+            raise GeminiRateLimitError(f"Gemini rate limit exceeded: {str(e)}") from e
+        except Exception as e:
+            raise GeminiError(f"Gemini API call failed: {str(e)}") from e
 
-            # Extract JSON from response (handle potential markdown formatting)
-            json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```',
-                                   response_text, re.DOTALL | re.MULTILINE)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # Try to find JSON without markdown
-                json_str = response_text.strip()
+        # Extract JSON from response (handle potential markdown formatting)
+        json_match = _FENCED_JSON_RE.search(response_text)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            # Try to find JSON without markdown
+            json_str = response_text.strip()
 
+        try:
             return json.loads(json_str)
-
         except json.JSONDecodeError as e:
-            raise GeminiError(f"Invalid JSON response from Gemini: {str(e)}")
-        except Exception as e:
-            raise GeminiError(f"Gemini API call failed: {str(e)}")
+            raise GeminiError(f"Invalid JSON response from Gemini: {str(e)}") from e
+
+    @staticmethod
+    def _prepare_image(photo_base64: str) -> Image.Image:
+        """Decode base64 photo data into an RGB image ready for Gemini."""
+        # Convert base64 to PIL Image
+        image_data = base64.b64decode(photo_base64)
+        image = Image.open(io.BytesIO(image_data))
+
+        # Downscale oversized photos; Gemini doesn't use the extra pixels
+        if max(image.size) > MAX_IMAGE_DIMENSION:
+            image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION),
+                            Image.Resampling.LANCZOS)
+
+        # Convert to RGB mode to ensure compatibility with Gemini API
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # Create white background for transparent images
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            if image.mode == 'P':
+                image = image.convert('RGBA')
+            background.paste(
+                image,
+                mask=image.getchannel('A') if image.mode in ('RGBA',
+                                                             'LA') else None)
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Force the (lazy) decode to happen here rather than in the API call
+        image.load()
+        return image
 
     def _build_prompt(self, transcript: str, language: str) -> str:
         """Build the prompt for Gemini story enhancement using PromptManager."""
-        # Language mapping for human-readable names
-        language_names = {
-            'en': 'English',
-            'es': 'Spanish',
-            'fr': 'French',
-            'de': 'German',
-            'it': 'Italian',
-            'pt': 'Portuguese',
-            'ja': 'Japanese',
-            'ko': 'Korean',
-            'zh': 'Chinese',
-            'ru': 'Russian',
-            'ar': 'Arabic',
-            'hi': 'Hindi'
-        }
-
-        lang_name = language_names.get(language, 'English')
+        lang_name = _LANGUAGE_NAMES.get(language, 'English')
 
         # Get the social prompt template from PromptManager
         try:
@@ -194,22 +338,10 @@ class GeminiService(AIStoryEnhancementService):
 
     def _parse_response(self, response: Dict[str, Any]) -> GeminiResponse:
         """Parse and validate Gemini API response."""
-        required_fields = ["enhanced_transcript", "insights"]
-
-        for field in required_fields:
-            if field not in response:
-                raise GeminiError(
-                    f"Invalid response format: missing '{field}' field")
-
-        # Validate insights structure
-        insights = response.get("insights", {})
-        if not isinstance(insights, dict):
-            raise GeminiError(
-                "Invalid response format: 'insights' must be an object")
-
-        return GeminiResponse(
-            enhanced_transcript=response["enhanced_transcript"],
-            insights=insights)
+        try:
+            return GeminiResponse.model_validate(response)
+        except ValidationError as e:
+            raise GeminiError(f"Invalid response format: {e}")
 
     def supports_vision(self) -> bool:
         """Check if this service supports vision/image analysis."""
@@ -1,18 +1,44 @@
 """
 Google OAuth authentication service for verifying ID tokens from iOS client.
 """
+import base64
+import binascii
+import json
 import logging
+import time
 from typing import Optional, Dict, Any
-from jose import JWTError, jwt
+import jwt
+from jwt.algorithms import RSAAlgorithm
+from jwt.exceptions import InvalidTokenError as JWTError
 from app.core.config import settings
 from app.models.user import User
 from app.schemas.auth import UserProfile
-from sqlalchemy.orm import Session
-from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
 import requests
 
 logger = logging.getLogger(__name__)
 
+# Minimum age of last_login before a repeat login rewrites it
+LAST_LOGIN_UPDATE_INTERVAL = timedelta(minutes=5)
+
+# Google's certificates and their parsed RSA keys, shared by all service
+# instances so the JWKS fetch and key construction happen once per process
+CERTS_CACHE_TTL_SECONDS = 3600
+CERTS_RETRY_INTERVAL_SECONDS = 60
+_certs_cache: Dict[str, Any] = {"certs": None, "public_keys": {}, "expires_at": 0.0}
+
+
+def clear_certs_cache() -> None:
+    """Forget cached Google certificates so the next instance refetches them."""
+    _certs_cache.update(certs=None, public_keys={}, expires_at=0.0)
+
+
+def _certs_cache_expired() -> bool:
+    """Check if the shared certificates are due for a (re)fetch."""
+    return time.monotonic() >= _certs_cache["expires_at"]
+
 
 class GoogleAuthError(Exception):
     """Custom exception for Google authentication errors."""
@@ -27,8 +53,11 @@ class GoogleAuthService:
     GOOGLE_TOKEN_INFO_URL = "https://oauth2.googleapis.com/tokeninfo"
     
     def __init__(self):
-        self.google_certs = None
-        self._load_google_certs()
+        # Reuse certificates/keys loaded by an earlier instance while fresh
+        self.google_certs = _certs_cache["certs"]
+        self.public_keys: Dict[str, Any] = _certs_cache["public_keys"]
+        if _certs_cache_expired():
+            self._load_google_certs()
     
     def _load_google_certs(self):
         """Load Google's public certificates for JWT verification."""
@@ -36,10 +65,23 @@ class GoogleAuthService:
             response = requests.get(self.GOOGLE_CERTS_URL, timeout=10)
             response.raise_for_status()
             self.google_certs = response.json()
+            # Parse each JWK into an RSA key once, instead of on every verify
+            self.public_keys = {
+                key["kid"]: RSAAlgorithm.from_jwk(json.dumps(key))
+                for key in self.google_certs.get("keys", [])
+            }
+            _certs_cache.update(
+                certs=self.google_certs,
+                public_keys=self.public_keys,
+                expires_at=time.monotonic() + CERTS_CACHE_TTL_SECONDS
+            )
             logger.info("✅ Google certificates loaded successfully")
         except Exception as e:
-            logger.error(f"❌ Failed to load Google certificates: {e}")
-            self.google_certs = None
+            logger.error("❌ Failed to load Google certificates: %s", e)
+            # Keep serving the last good keys and space out the retries
+            self.google_certs = _certs_cache["certs"]
+            self.public_keys = _certs_cache["public_keys"]
+            _certs_cache["expires_at"] = time.monotonic() + CERTS_RETRY_INTERVAL_SECONDS
     
     async def verify_id_token(self, id_token: str) -> Dict[str, Any]:
         """
@@ -66,7 +108,7 @@ class GoogleAuthService:
             return await self._verify_token_production(id_token)
             
         except Exception as e:
-            logger.error(f"❌ ID token verification failed: {e}")
+            logger.error("❌ ID token verification failed: %s", e)
             raise GoogleAuthError(f"Invalid ID token: {str(e)}")
     
     async def _verify_token_debug(self, id_token: str) -> Dict[str, Any]:
@@ -89,61 +131,67 @@ class GoogleAuthService:
             if 'sub' not in token_info:
                 raise GoogleAuthError("Token missing subject")
             
-            logger.info(f"✅ Token verified for user: {token_info.get('email')}")
+            logger.info("✅ Token verified for user: %s", token_info.get('email'))
             return token_info
             
         except requests.RequestException as e:
-            logger.error(f"❌ Google tokeninfo API error: {e}")
+            logger.error("❌ Google tokeninfo API error: %s", e)
             raise GoogleAuthError("Failed to verify token with Google")
     
     async def _verify_token_production(self, id_token: str) -> Dict[str, Any]:
         """Production verification using Google's public certificates."""
-        if not self.google_certs:
+        if not self.google_certs and _certs_cache_expired():
             self._load_google_certs()
             
         if not self.google_certs:
             raise GoogleAuthError("Google certificates not available")
         
+        # Reject unknown/rotated keys before doing any crypto
+        key_id = self._get_key_id(id_token)
+        if not key_id:
+            raise GoogleAuthError("Invalid key ID in token")
+        
+        public_key = self.public_keys.get(key_id)
+        if public_key is None:
+            raise GoogleAuthError("Public key not found")
+        
         try:
-            # Decode header to get key ID
-            unverified_header = jwt.get_unverified_header(id_token)
-            key_id = unverified_header.get("kid")
-            
-            if not key_id or key_id not in self.google_certs.get("keys", {}):
-                raise GoogleAuthError("Invalid key ID in token")
-            
-            # Get the public key
-            key_data = None
-            for key in self.google_certs["keys"]:
-                if key["kid"] == key_id:
-                    key_data = key
-                    break
-            
-            if not key_data:
-                raise GoogleAuthError("Public key not found")
-            
             # Verify and decode the token
             payload = jwt.decode(
                 id_token,
-                key_data,
+                public_key,
                 algorithms=["RS256"],
                 audience=settings.google_client_id,
                 issuer="https://accounts.google.com"
             )
             
-            logger.info(f"✅ Token verified for user: {payload.get('email')}")
+            logger.info("✅ Token verified for user: %s", payload.get('email'))
             return payload
             
         except JWTError as e:
             raise GoogleAuthError(f"JWT verification failed: {str(e)}")
     
-    async def get_or_create_user(self, token_info: Dict[str, Any], db: Session) -> User:
+    @staticmethod
+    def _get_key_id(id_token: str) -> Optional[str]:
+        """Extract the key ID from the token header without a full JWT parse."""
+        header_b64 = id_token.split(".", 1)[0]
+        padding = "=" * (-len(header_b64) % 4)
+        try:
+            header = json.loads(base64.urlsafe_b64decode(header_b64 + padding))
+        except (ValueError, binascii.Error):
+            return None
+        if not isinstance(header, dict):
+            return None
+        kid = header.get("kid")
+        return kid if isinstance(kid, str) else None
+    
+    async def get_or_create_user(self, token_info: Dict[str, Any], db: AsyncSession) -> User:
         """
         Get existing user or create new user from Google token information.
         
         Args:
             token_info: Verified token payload from Google
-            db: Database session
+            db: Async database session
             
         Returns:
             User model instance
@@ -152,41 +200,51 @@ class GoogleAuthService:
         email = token_info["email"]
         name = token_info.get("name")
         picture = token_info.get("picture")
+        # last_login is a naive DateTime column, so store UTC without tzinfo
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
         
         try:
             # Check if user already exists by Google ID
-            existing_user = db.query(User).filter(User.google_id == google_id).first()
+            result = await db.execute(select(User).where(User.google_id == google_id))
+            existing_user = result.scalar_one_or_none()
             
             if existing_user:
-                # Update last login and any changed information
-                existing_user.last_login = datetime.now(timezone.utc)
+                # Only write when something actually changed; most repeat logins
+                # stay read-only transactions
+                changed = False
+                if self._should_touch_last_login(existing_user.last_login, now):
+                    existing_user.last_login = now
+                    changed = True
                 if name and existing_user.name != name:
                     existing_user.name = name
+                    changed = True
                 if picture and existing_user.picture != picture:
                     existing_user.picture = picture
+                    changed = True
                 
-                db.commit()
-                db.refresh(existing_user)
+                if changed:
+                    await db.commit()
                 
-                logger.info(f"✅ Existing user logged in: {email}")
+                logger.info("✅ Existing user logged in: %s", email)
                 return existing_user
             
             # Check if user exists with same email but different Google ID
             # This handles cases where user might have multiple Google accounts
-            existing_by_email = db.query(User).filter(User.email == email).first()
+            result = await db.execute(select(User).where(User.email == email))
+            existing_by_email = result.scalar_one_or_none()
             if existing_by_email:
                 # Update the existing user's Google ID
                 existing_by_email.google_id = google_id
-                existing_by_email.last_login = datetime.now(timezone.utc)
+                existing_by_email.last_login = now
                 if name:
                     existing_by_email.name = name
                 if picture:
                     existing_by_email.picture = picture
                 
-                db.commit()
-                db.refresh(existing_by_email)
+                await db.commit()
+                await db.refresh(existing_by_email)
                 
-                logger.info(f"✅ User updated with new Google ID: {email}")
+                logger.info("✅ User updated with new Google ID: %s", email)
                 return existing_by_email
             
             # Create new user
@@ -196,21 +254,31 @@ class GoogleAuthService:
                 name=name,
                 picture=picture,
                 google_id=google_id,
-                last_login=datetime.now(timezone.utc)
+                last_login=now
             )
             
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
             
-            logger.info(f"✅ New user created: {email}")
+            logger.info("✅ New user created: %s", email)
             return new_user
             
         except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Failed to get/create user: {e}")
+            await db.rollback()
+            logger.error("❌ Failed to get/create user: %s", e)
             raise GoogleAuthError("Failed to process user data")
     
+    @staticmethod
+    def _should_touch_last_login(last_login: Optional[datetime], now: datetime) -> bool:
+        """Check if last_login is stale enough to be worth an UPDATE."""
+        if last_login is None:
+            return True
+        # Rows written before naive UTC was enforced may still carry tzinfo
+        if last_login.tzinfo is not None:
+            last_login = last_login.astimezone(timezone.utc).replace(tzinfo=None)
+        return now - last_login > LAST_LOGIN_UPDATE_INTERVAL
+    
     def generate_jwt_token(self, user: User) -> str:
         """
         Generate JWT token for authenticated user.
@@ -222,25 +290,24 @@ class GoogleAuthService:
             JWT token string
         """
         try:
-            from datetime import timedelta
-            
-            # Token payload
+            # Token payload (iat/exp as integer epoch seconds)
+            issued_at = int(time.time())
             payload = {
                 "sub": user.user_id,  # Subject (user ID)
                 "email": user.email,
                 "name": user.name,
-                "iat": datetime.now(timezone.utc),
-                "exp": datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
+                "iat": issued_at,
+                "exp": issued_at + settings.access_token_expire_minutes * 60
             }
             
             # Generate JWT token
             token = jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
             
-            logger.info(f"✅ JWT token generated for user: {user.email}")
+            logger.info("✅ JWT token generated for user: %s", user.email)
             return token
             
         except Exception as e:
-            logger.error(f"❌ Failed to generate JWT token: {e}")
+            logger.error("❌ Failed to generate JWT token: %s", e)
             raise GoogleAuthError("Failed to generate authentication token")
     
     def create_user_profile(self, user: User) -> UserProfile:
@@ -267,5 +334,5 @@ class GoogleAuthService:
             self._load_google_certs()
             return self.google_certs is not None
         except Exception as e:
-            logger.error(f"Google Auth service test failed: {e}")
+            logger.error("Google Auth service test failed: %s", e)
             return False
\ No newline at end of file
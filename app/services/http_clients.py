@@ -0,0 +1,34 @@
+"""
+Shared HTTP clients for outbound AI provider calls.
+Reusing one connection pool avoids a new TCP/TLS handshake per request.
+"""
+from typing import Optional
+import httpx
+
+# Keep-alive pool sized for concurrent story + TTS requests
+HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=32,
+    max_connections=64,
+    keepalive_expiry=60
+)
+HTTP_TIMEOUT = httpx.Timeout(30.0)
+
+_shared_async_httpx_client: Optional[httpx.AsyncClient] = None
+
+
+def get_shared_async_httpx_client() -> httpx.AsyncClient:
+    """Get the process-wide async httpx client, creating it on first use."""
+    global _shared_async_httpx_client
+    if _shared_async_httpx_client is None:
+        _shared_async_httpx_client = httpx.AsyncClient(
+            limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT
+        )
+    return _shared_async_httpx_client
+
+
+async def close_shared_async_httpx_client() -> None:
+    """Close the async client; called from the app lifespan on shutdown."""
+    global _shared_async_httpx_client
+    if _shared_async_httpx_client is not None:
+        await _shared_async_httpx_client.aclose()
+        _shared_async_httpx_client = None
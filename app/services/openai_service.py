@@ -2,13 +2,66 @@
 OpenAI story enhancement service for analyzing photos and enhancing story transcripts.
 """
 import os
+import asyncio
+import binascii
 import json
 import re
-from typing import Dict, Any, List
+from types import MappingProxyType
+from typing import Dict, Any, List, Tuple, Union
+from pydantic import ValidationError
 import openai
+from openai import AuthenticationError, RateLimitError
 from app.services.ai_service_interface import AIStoryEnhancementService
 from app.schemas.ai_response import AIResponse
-from app.services.prompt_manager import prompt_manager
+from app.services.prompt_manager import prompt_manager, PromptTemplate
+from app.services.http_clients import get_shared_async_httpx_client
+
+# Fenced-JSON fallback pattern, compiled once for every response parse
+_FENCED_JSON_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL | re.MULTILINE)
+
+# Base64 alphabet (line breaks and padding allowed, as b64decode accepts them),
+# checked over the first _BASE64_CHECK_CHARS characters of a photo
+_BASE64_PREFIX_RE = re.compile(r'[A-Za-z0-9+/=\s]+')
+_BASE64_CHECK_CHARS = 1024
+
+# Language mapping for human-readable names
+_LANGUAGE_NAMES = MappingProxyType({
+    'en': 'English',
+    'es': 'Spanish',
+    'fr': 'French',
+    'de': 'German',
+    'it': 'Italian',
+    'pt': 'Portuguese',
+    'ja': 'Japanese',
+    'ko': 'Korean',
+    'zh': 'Chinese',
+    'ru': 'Russian',
+    'ar': 'Arabic',
+    'hi': 'Hindi'
+})
+_VALID_LANGUAGES = frozenset(_LANGUAGE_NAMES)
+
+# Leading magic bytes of the image formats the vision models accept
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+    (b'RIFF', 'image/webp'),
+)
+
+# JSON format instruction appended for OpenAI
+_JSON_INSTRUCTION = "\n\nPlease respond with a valid JSON object containing 'enhanced_transcript' and 'insights' fields."
+
+# Prompt rendered per language with a placeholder transcript, split around it
+_TRANSCRIPT_SENTINEL = "\x00transcript\x00"
+_prompt_parts_cache: Dict[str, Tuple[PromptTemplate, List[str]]] = {}
+
+# In-flight OpenAI calls per enhance_story_batch, to stay under RPM limits
+DEFAULT_BATCH_CONCURRENCY = 8
+
+# OpenAI Batch API endpoint/window for non-urgent bulk enhancements
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
 
 
 class OpenAIError(Exception):
@@ -16,6 +69,11 @@ class OpenAIError(Exception):
     pass
 
 
+class OpenAIRateLimitError(OpenAIError):
+    """Raised when OpenAI rejects a request for rate limit or quota reasons."""
+    pass
+
+
 class OpenAIService(AIStoryEnhancementService):
     """Service for story enhancement using OpenAI's GPT models with optional vision capabilities."""
 
@@ -29,8 +87,9 @@ class OpenAIService(AIStoryEnhancementService):
         # Set model with fallback to config default
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4-vision-preview")
 
-        # Initialize OpenAI client
-        self.client = openai.OpenAI(api_key=self.api_key)
+        # Initialize async OpenAI client on the shared connection pool
+        self.client = openai.AsyncOpenAI(
+            api_key=self.api_key, http_client=get_shared_async_httpx_client())
 
         # Define vision-capable models
         self.vision_models = {"gpt-4-vision-preview", "gpt-4-turbo", "chatgpt-4o-latest"}
@@ -53,22 +112,147 @@ class OpenAIService(AIStoryEnhancementService):
         Raises:
             OpenAIError: If validation fails or API call fails
         """
-        try:
-            # Validate inputs
-            self._validate_inputs(photo_base64, transcript, language)
+        # Validate inputs
+        self._validate_inputs(photo_base64, transcript, language)
 
-            # Call OpenAI API
-            response = self._call_openai_api(photo_base64=photo_base64,
+        # Call OpenAI API
+        try:
+            response = await self._call_openai_api(photo_base64=photo_base64,
                                                    transcript=transcript,
                                                    language=language)
+        except OpenAIError:
+            raise
+        except Exception as e:
+            raise OpenAIError(f"OpenAI API error: {str(e)}") from e
+
+        # Validate and return response
+        return self._parse_response(response)
+
+    async def enhance_story_batch(
+            self,
+            items: List[Tuple[str, str, str]],
+            max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+    ) -> List[Union[AIResponse, OpenAIError]]:
+        """
+        Enhance several stories concurrently over the shared client.
+
+        Args:
+            items: (photo_base64, transcript, language) tuples
+            max_concurrency: Maximum number of requests in flight at once
+
+        Returns:
+            One AIResponse or OpenAIError per item, in input order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def enhance(photo_base64: str, transcript: str, language: str) -> AIResponse:
+            async with semaphore:
+                return await self.enhance_story_with_photo(photo_base64=photo_base64,
+                                                           transcript=transcript,
+                                                           language=language)
 
-            # Validate and return response
-            return self._parse_response(response)
+        return await asyncio.gather(*(enhance(*item) for item in items),
+                                    return_exceptions=True)
 
+    async def submit_story_batch(self, items: Dict[str, Tuple[str, str, str]]) -> str:
+        """
+        Submit enhancements to the OpenAI Batch API (half price, 24h turnaround).
+
+        Args:
+            items: Mapping of custom_id to (photo_base64, transcript, language)
+
+        Returns:
+            OpenAI batch ID, to pass to retrieve_batch_results later
+
+        Raises:
+            OpenAIError: If an item is invalid or the submission fails
+        """
+        lines = []
+        for custom_id, (photo_base64, transcript, language) in items.items():
+            self._validate_inputs(photo_base64, transcript, language)
+            prompt = self._build_prompt(transcript, language)
+            body = {
+                "model": self.model,
+                "messages": self._build_messages(prompt, photo_base64),
+                "temperature": 0.7,
+                "max_tokens": 2048,
+                "prompt_cache_key": self._prompt_cache_key(language)
+            }
+            if self.supports_vision():
+                body["response_format"] = {"type": "json_object"}
+            lines.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": body
+            }))
+
+        try:
+            batch_file = await self.client.files.create(
+                file=("story_batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window=BATCH_COMPLETION_WINDOW
+            )
+            return batch.id
         except Exception as e:
-            if isinstance(e, OpenAIError):
-                raise
-            raise OpenAIError(f"OpenAI API error: {str(e)}")
+            raise OpenAIError(f"OpenAI batch submission failed: {str(e)}")
+
+    async def retrieve_batch_results(
+            self, batch_id: str) -> Dict[str, Union[AIResponse, OpenAIError]]:
+        """
+        Download and parse the results of a completed batch.
+
+        Args:
+            batch_id: ID returned by submit_story_batch
+
+        Returns:
+            Mapping of custom_id to AIResponse, or OpenAIError for failed items
+
+        Raises:
+            OpenAIError: If the batch is not completed or cannot be downloaded
+        """
+        try:
+            batch = await self.client.batches.retrieve(batch_id)
+        except Exception as e:
+            raise OpenAIError(f"Failed to retrieve OpenAI batch: {str(e)}")
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise OpenAIError(f"OpenAI batch {batch_id} is not completed (status: {batch.status})")
+
+        try:
+            output = await self.client.files.content(batch.output_file_id)
+        except Exception as e:
+            raise OpenAIError(f"Failed to download OpenAI batch results: {str(e)}")
+
+        results: Dict[str, Union[AIResponse, OpenAIError]] = {}
+        for line in output.text.splitlines():
+            if not line or line.isspace():
+                continue
+            record = json.loads(line)
+            results[record["custom_id"]] = self._parse_batch_record(record)
+        return results
+
+    def _parse_batch_record(self, record: Dict[str, Any]) -> Union[AIResponse, OpenAIError]:
+        """Parse one line of a Batch API output file."""
+        if record.get("error"):
+            return OpenAIError(f"OpenAI batch request failed: {record['error']}")
+
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            return OpenAIError(
+                f"OpenAI batch request failed with status {response.get('status_code')}")
+
+        try:
+            response_text = response["body"]["choices"][0]["message"]["content"]
+            return self._parse_response(self._extract_json_from_response(response_text))
+        except OpenAIError as e:
+            return e
+        except (KeyError, IndexError, TypeError, json.JSONDecodeError) as e:
+            return OpenAIError(f"Invalid OpenAI batch response: {str(e)}")
 
     def supports_vision(self) -> bool:
         """Check if this service supports vision/image analysis."""
@@ -81,82 +265,79 @@ class OpenAIService(AIStoryEnhancementService):
     def _validate_inputs(self, photo_base64: str, transcript: str,
                          language: str) -> None:
         """Validate input parameters."""
-        if not photo_base64 or not photo_base64.strip():
+        if not photo_base64 or photo_base64.isspace():
             raise OpenAIError("Photo data is required")
 
-        if not transcript or not transcript.strip():
+        if not transcript or transcript.isspace():
             raise OpenAIError("Transcript is required")
 
         if len(transcript) > 5000:
             raise OpenAIError("Transcript too long (max 5000 characters)")
 
+        # Reject obviously malformed payloads before an upload round trip;
+        # only a bounded prefix is scanned so large photos aren't decoded twice
+        if not _BASE64_PREFIX_RE.fullmatch(photo_base64, 0, _BASE64_CHECK_CHARS):
+            raise OpenAIError("Photo data is not valid base64")
+
         # Validate language code (ISO 639-1)
-        valid_languages = {
-            'en', 'es', 'fr', 'de', 'it', 'pt', 'ja', 'ko', 'zh', 'ru', 'ar',
-            'hi'
-        }
-        if language not in valid_languages:
+        if language not in _VALID_LANGUAGES:
             raise OpenAIError(f"Invalid language code: {language}")
 
-    def _call_openai_api(self, photo_base64: str, transcript: str,
+    async def _call_openai_api(self, photo_base64: str, transcript: str,
                                language: str) -> Dict[str, Any]:
         """Make the actual API call to OpenAI."""
-        try:
-            # Build prompt using PromptManager
-            prompt = self._build_prompt(transcript, language)
+        # Build prompt using PromptManager
+        prompt = self._build_prompt(transcript, language)
 
-            # Build messages based on model capabilities
-            messages = self._build_messages(prompt, photo_base64)
+        # Build messages based on model capabilities
+        messages = self._build_messages(prompt, photo_base64)
 
-            # Generate content with OpenAI
-            response = self.client.chat.completions.create(
+        # Generate content with OpenAI; the cache key lets requests that
+        # share the template/language prefix reuse OpenAI's prompt cache
+        try:
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=2048,
-                response_format={"type": "json_object"} if self.supports_vision() else None
+                response_format={"type": "json_object"} if self.supports_vision() else None,
+                extra_body={"prompt_cache_key": self._prompt_cache_key(language)}
             )
-
-            # Extract response text
             response_text = response.choices[0].message.content
+        except RateLimitError as e:
+            raise OpenAIRateLimitError(f"OpenAI rate limit exceeded: {str(e)}") from e
+        except AuthenticationError as e:
+            raise OpenAIError(f"OpenAI authentication failed: {str(e)}") from e
+        except Exception as e:
+            raise OpenAIError(f"OpenAI API call failed: {str(e)}") from e
 
-            # Parse JSON response
-            return self._extract_json_from_response(response_text)
+        # Parse JSON response
+        return self._extract_json_from_response(response_text)
 
-        except json.JSONDecodeError as e:
-            raise OpenAIError(f"Invalid JSON response from OpenAI: {str(e)}")
-        except Exception as e:
-            raise OpenAIError(f"OpenAI API call failed: {str(e)}")
+    @staticmethod
+    def _prompt_cache_key(language: str) -> str:
+        """Get the OpenAI prompt cache key for the social template in a language."""
+        version = prompt_manager.get_prompt("social").version
+        return f"amplify-social-{language}-{version}"
 
     def _build_prompt(self, transcript: str, language: str) -> str:
         """Build the prompt for OpenAI story enhancement using PromptManager."""
-        # Language mapping for human-readable names
-        language_names = {
-            'en': 'English',
-            'es': 'Spanish',
-            'fr': 'French',
-            'de': 'German',
-            'it': 'Italian',
-            'pt': 'Portuguese',
-            'ja': 'Japanese',
-            'ko': 'Korean',
-            'zh': 'Chinese',
-            'ru': 'Russian',
-            'ar': 'Arabic',
-            'hi': 'Hindi'
-        }
-
-        lang_name = language_names.get(language, 'English')
+        lang_name = _LANGUAGE_NAMES.get(language, 'English')
 
         # Get the social prompt template from PromptManager
         try:
             prompt_template = prompt_manager.get_prompt("social")
-            base_prompt = prompt_template.format(transcript=transcript,
-                                          language_name=lang_name)
 
-            # Add JSON format instruction for OpenAI
-            json_instruction = "\n\nPlease respond with a valid JSON object containing 'enhanced_transcript' and 'insights' fields."
-            return base_prompt + json_instruction
+            # Render the language-specific part once per template (re)load;
+            # each call then only splices in the transcript
+            cached = _prompt_parts_cache.get(language)
+            if cached is None or cached[0] is not prompt_template:
+                rendered = prompt_template.format(transcript=_TRANSCRIPT_SENTINEL,
+                                                  language_name=lang_name)
+                cached = (prompt_template, rendered.split(_TRANSCRIPT_SENTINEL))
+                _prompt_parts_cache[language] = cached
+
+            return transcript.join(cached[1]) + _JSON_INSTRUCTION
 
         except Exception as e:
             # Fallback to error message if prompt loading fails
@@ -177,7 +358,7 @@ class OpenAIService(AIStoryEnhancementService):
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{photo_base64}"
+                                "url": f"data:{self._image_mime_type(photo_base64)};base64,{photo_base64}"
                             }
                         }
                     ]
@@ -193,30 +374,48 @@ class OpenAIService(AIStoryEnhancementService):
                 }
             ]
 
+    @staticmethod
+    def _image_mime_type(photo_base64: str) -> str:
+        """Detect the image MIME type from the first decoded bytes, defaulting to JPEG."""
+        # 16 base64 chars decode to 12 bytes, enough for every signature
+        try:
+            header = binascii.a2b_base64(photo_base64[:16])
+        except binascii.Error:
+            return 'image/jpeg'
+        for signature, mime_type in _IMAGE_SIGNATURES:
+            if header.startswith(signature):
+                return mime_type
+        return 'image/jpeg'
+
     def _extract_json_from_response(self, response_text: str) -> Dict[str, Any]:
         """Extract JSON from OpenAI response, handling potential markdown formatting."""
-        # First try to parse as-is (for JSON mode responses)
+        # Fast path: JSON mode responses are already a bare object
         try:
-            return json.loads(response_text.strip())
+            return json.loads(response_text)
         except json.JSONDecodeError:
             pass
 
-        # Try to extract JSON from markdown code blocks
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```',
-                               response_text, re.DOTALL | re.MULTILINE)
+        # Slice out the outermost object (also covers fenced code blocks)
+        start = response_text.find('{')
+        end = response_text.rfind('}')
+        if start != -1 and end > start:
+            try:
+                return json.loads(response_text[start:end + 1])
+            except json.JSONDecodeError:
+                pass
+
+        # Last resort: JSON inside a markdown code block with trailing braces
+        json_match = _FENCED_JSON_RE.search(response_text)
         if json_match:
-            json_str = json_match.group(1)
-            return json.loads(json_str)
-
-        # Try to find JSON object in the text
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group(0))
+            return json.loads(json_match.group(1))
 
         raise OpenAIError(f"Could not extract valid JSON from response: {response_text}")
 
     def _parse_response(self, response: Dict[str, Any]) -> AIResponse:
         """Parse and validate OpenAI API response."""
+        if not isinstance(response, dict):
+            raise OpenAIError("Invalid response format: expected a JSON object")
+
         required_fields = ["enhanced_transcript", "insights"]
 
         for field in required_fields:
@@ -230,6 +429,9 @@ class OpenAIService(AIStoryEnhancementService):
             raise OpenAIError(
                 "Invalid response format: 'insights' must be an object")
 
-        return AIResponse(
-            enhanced_transcript=response["enhanced_transcript"],
-            insights=insights)
+        try:
+            return AIResponse(
+                enhanced_transcript=response["enhanced_transcript"],
+                insights=insights)
+        except ValidationError as e:
+            raise OpenAIError(f"Invalid response format: {e}")
@@ -1,14 +1,25 @@
 """
 Prompt management service for externalized AI prompts.
 """
+import functools
 import os
+import string
 import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from app.core.config import settings
 
+# Minimum seconds between prompt file mtime checks per category
+STAT_CHECK_INTERVAL_SECONDS = 2.0
+
+# libyaml's C loader parses several times faster; fall back when PyYAML lacks it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Rendered prompts remembered per template (retries/resubmits reuse them)
+PROMPT_RENDER_CACHE_SIZE = 256
+
 
 class PromptTemplate(BaseModel):
     """Model for a loaded prompt template."""
@@ -21,14 +32,52 @@ class PromptTemplate(BaseModel):
     variables: list[str] = Field(default_factory=list)
     template: str
     
+    # Template pre-parsed into (literal, variable) pairs at load time
+    _segments: Optional[List[Tuple[str, Optional[str]]]] = PrivateAttr(default=None)
+    _required: frozenset = PrivateAttr(default=frozenset())
+    # Memoized _render; lives on the instance so a reloaded template starts empty
+    _render_cached: Optional[Callable[..., str]] = PrivateAttr(default=None)
+    
+    def model_post_init(self, __context: Any) -> None:
+        """Parse the template once and check its placeholders against variables."""
+        self._required = frozenset(self.variables)
+        
+        segments = []
+        simple = True
+        for literal, field, spec, conversion in string.Formatter().parse(self.template):
+            if field is not None:
+                if spec or conversion or not field.isidentifier():
+                    # Format specs/attribute access: fall back to str.format
+                    simple = False
+                elif field not in self._required:
+                    raise ValueError(f"Template uses undeclared variable: {field}")
+            segments.append((literal, field))
+        
+        self._segments = segments if simple else None
+        self._render_cached = functools.lru_cache(maxsize=PROMPT_RENDER_CACHE_SIZE)(self._render)
+    
     def format(self, **kwargs) -> str:
         """Format the template with provided variables."""
         # Validate that all required variables are provided
-        missing_vars = [var for var in self.variables if var not in kwargs]
-        if missing_vars:
+        if not self._required.issubset(kwargs):
+            missing_vars = [var for var in self.variables if var not in kwargs]
             raise ValueError(f"Missing required variables: {missing_vars}")
         
-        return self.template.format(**kwargs)
+        try:
+            return self._render_cached(**kwargs)
+        except TypeError:
+            # Unhashable variable values can't be memoized
+            return self._render(**kwargs)
+    
+    def _render(self, **kwargs) -> str:
+        """Substitute variables into the pre-parsed template."""
+        if self._segments is None:
+            return self.template.format(**kwargs)
+        
+        return "".join([
+            literal if field is None else literal + str(kwargs[field])
+            for literal, field in self._segments
+        ])
 
 
 class PromptManagerError(Exception):
@@ -47,9 +96,11 @@ class PromptManager:
         # Cache for loaded prompts
         self._prompt_cache: Dict[str, PromptTemplate] = {}
         self._file_mtimes: Dict[str, float] = {}
+        self._last_stat_check: Dict[str, float] = {}
         
         # Load configuration and prompts
         self._load_config()
+        self._hot_reload = self._is_hot_reload_enabled()
         self.reload_prompts()
     
     def _load_config(self) -> None:
@@ -59,15 +110,22 @@ class PromptManager:
                 raise PromptManagerError(f"Config file not found: {self.config_file}")
             
             with open(self.config_file, 'r', encoding='utf-8') as f:
-                self.config = yaml.safe_load(f)
+                self.config = yaml.load(f, Loader=_YAML_LOADER)
                 
         except Exception as e:
             raise PromptManagerError(f"Failed to load config: {str(e)}")
     
     def _should_reload(self, category: str) -> bool:
         """Check if a category file should be reloaded based on modification time."""
-        if not self._is_hot_reload_enabled():
+        if not self._hot_reload:
+            return False
+        
+        # Rate-limit the stat syscall instead of paying it on every request
+        now = time.monotonic()
+        last_check = self._last_stat_check.get(category)
+        if last_check is not None and now - last_check < STAT_CHECK_INTERVAL_SECONDS:
             return False
+        self._last_stat_check[category] = now
         
         category_file = self._get_category_file_path(category)
         if not category_file.exists():
@@ -80,6 +138,10 @@ class PromptManager:
     
     def _is_hot_reload_enabled(self) -> bool:
         """Check if hot reload is enabled."""
+        # Never watch prompt files outside debug mode
+        if not settings.debug:
+            return False
+        
         # Check settings first, then config file, default to debug mode
         if hasattr(settings, 'prompts_hot_reload'):
             return settings.prompts_hot_reload
@@ -98,36 +160,40 @@ class PromptManager:
         """Load a single prompt file."""
         category_file = self._get_category_file_path(category)
         
+        if not category_file.exists():
+            raise PromptManagerError(f"Prompt file not found: {category_file}")
+        
         try:
-            if not category_file.exists():
-                raise PromptManagerError(f"Prompt file not found: {category_file}")
-            
             with open(category_file, 'r', encoding='utf-8') as f:
-                prompt_data = yaml.safe_load(f)
-            
-            # Validate the prompt data structure
-            if not isinstance(prompt_data, dict):
-                raise PromptManagerError(f"Invalid prompt file format: {category_file}")
-            
-            # Update file modification time
-            self._file_mtimes[category] = os.path.getmtime(category_file)
-            
-            return PromptTemplate(**prompt_data)
-            
-        except Exception as e:
-            raise PromptManagerError(f"Failed to load prompt file {category_file}: {str(e)}")
+                prompt_data = yaml.load(f, Loader=_YAML_LOADER)
+            mtime = os.path.getmtime(category_file)
+        except (OSError, yaml.YAMLError) as e:
+            raise PromptManagerError(f"Failed to load prompt file {category_file}: {str(e)}") from e
+        
+        # Validate the prompt data structure
+        if not isinstance(prompt_data, dict):
+            raise PromptManagerError(f"Invalid prompt file format: {category_file}")
+        
+        try:
+            prompt_template = PromptTemplate(**prompt_data)
+        except (TypeError, ValueError) as e:
+            raise PromptManagerError(f"Failed to load prompt file {category_file}: {str(e)}") from e
+        
+        # Update file modification time
+        self._file_mtimes[category] = mtime
+        self._last_stat_check[category] = time.monotonic()
+        
+        return prompt_template
     
     def reload_prompts(self) -> None:
         """Reload all prompts from disk."""
-        try:
-            categories = self.config.get('categories', {})
-            
-            for category in categories.keys():
-                prompt_template = self._load_prompt_file(category)
-                self._prompt_cache[category] = prompt_template
-                
-        except Exception as e:
-            raise PromptManagerError(f"Failed to reload prompts: {str(e)}")
+        categories = self.config.get('categories', {})
+        
+        for category in categories.keys():
+            try:
+                self._prompt_cache[category] = self._load_prompt_file(category)
+            except PromptManagerError as e:
+                raise PromptManagerError(f"Failed to reload prompts: {str(e)}") from e
     
     def get_prompt(self, category: str) -> PromptTemplate:
         """
@@ -142,6 +208,13 @@ class PromptManager:
         Raises:
             PromptManagerError: If category doesn't exist or loading fails
         """
+        # Production: every category was preloaded, so this is a dict lookup
+        if not self._hot_reload:
+            prompt_template = self._prompt_cache.get(category)
+            if prompt_template is None:
+                raise PromptManagerError(f"Unknown category: {category}")
+            return prompt_template
+        
         # Check if we need to reload due to file changes
         if self._should_reload(category):
             try:
@@ -4,31 +4,57 @@ Converts enhanced transcripts to audio for the mobile app.
 """
 import base64
 import io
-from typing import Optional, Tuple
+from types import MappingProxyType
+from typing import AsyncIterator, Optional, Tuple
 from app.core.config import settings
+from app.services.http_clients import get_shared_async_httpx_client
 import logging
 
 # Try to import TTS libraries, fall back to mock implementation if unavailable
 try:
     import openai
+    from openai import AuthenticationError, RateLimitError
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
 try:
-    from elevenlabs.client import ElevenLabs
+    from elevenlabs.client import AsyncElevenLabs
     ELEVENLABS_AVAILABLE = True
 except ImportError:
     ELEVENLABS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Voices accepted by OpenAI's tts-1 models
+_OPENAI_VOICES = frozenset({"alloy", "echo", "fable", "onyx", "nova", "shimmer"})
+
+# Map language codes to ElevenLabs voice IDs (these are common pre-made voices)
+_DEFAULT_ELEVENLABS_VOICE = "21m00Tcm4TlvDq8ikWAM"  # Rachel - Clear female American voice
+_ELEVENLABS_VOICE_BY_LANG = MappingProxyType({
+    "en": _DEFAULT_ELEVENLABS_VOICE,
+    "es": "VR6AewLTigWG4xSOukaG",  # Sofia - Spanish voice
+    "fr": "XB0fDUnXU5powFXDhCwa",  # Charlotte - French voice
+    "de": "jBpfuIE2acCO8z3wKNLl",  # Gigi - German voice
+    "it": "oWAxZDx7w5VEj9dCyTzz",  # Giulia - Italian voice
+    "pt": "pMsXgVXv3BLzUgSXRplE",  # Liam - Portuguese voice
+})
+
+# Minimal silent MP3 frame (header + padding) served when no provider is configured
+_MOCK_MP3 = b"\xff\xfb\x90\x00" + bytes(32)
+_MOCK_MP3_BASE64 = base64.b64encode(_MOCK_MP3).decode('utf-8')
+
 
 class TTSError(Exception):
     """Custom exception for TTS service errors."""
     pass
 
 
+class TTSRateLimitError(TTSError):
+    """Raised when a TTS provider rejects a request for rate limit or quota reasons."""
+    pass
+
+
 class TTSService:
     """Text-to-Speech service supporting multiple providers."""
     
@@ -42,10 +68,13 @@ class TTSService:
         # Initialize OpenAI client
         if OPENAI_AVAILABLE and settings.openai_api_key:
             try:
-                self.openai_client = openai.OpenAI(api_key=settings.openai_api_key)
+                self.openai_client = openai.AsyncOpenAI(
+                    api_key=settings.openai_api_key,
+                    http_client=get_shared_async_httpx_client()
+                )
                 logger.info("✅ OpenAI TTS client initialized successfully")
             except Exception as e:
-                logger.warning(f"⚠️ Failed to initialize OpenAI TTS client: {e}")
+                logger.warning("⚠️ Failed to initialize OpenAI TTS client: %s", e)
                 self.openai_client = None
         elif not OPENAI_AVAILABLE:
             logger.warning("⚠️ OpenAI library not available")
@@ -53,10 +82,13 @@ class TTSService:
         # Initialize ElevenLabs
         if ELEVENLABS_AVAILABLE and settings.elevenlabs_api_key:
             try:
-                self.elevenlabs_client = ElevenLabs(api_key=settings.elevenlabs_api_key)
+                self.elevenlabs_client = AsyncElevenLabs(
+                    api_key=settings.elevenlabs_api_key,
+                    httpx_client=get_shared_async_httpx_client()
+                )
                 logger.info("✅ ElevenLabs TTS initialized successfully")
             except Exception as e:
-                logger.warning(f"⚠️ Failed to initialize ElevenLabs TTS: {e}")
+                logger.warning("⚠️ Failed to initialize ElevenLabs TTS: %s", e)
                 self.elevenlabs_client = None
         elif not ELEVENLABS_AVAILABLE:
             logger.warning("⚠️ ElevenLabs library not available")
@@ -81,26 +113,104 @@ class TTSService:
         Raises:
             TTSError: If TTS generation fails
         """
-        if not text or not text.strip():
+        text = self._prepare_text(text)
+        provider = self._select_provider()
+        
+        if provider == "openai":
+            return await self._generate_openai_audio(text, language, voice)
+        elif provider == "elevenlabs":
+            return await self._generate_elevenlabs_audio(text, language, voice)
+        else:
+            return await self._generate_mock_audio(text, language)
+    
+    async def stream_audio(
+        self,
+        text: str,
+        language: str = "en",
+        voice: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream raw MP3 audio as the configured TTS provider produces it.
+        
+        Args:
+            text: The enhanced transcript to convert to speech
+            language: Language code (e.g., 'en', 'es', 'fr')
+            voice: Voice name (provider-specific)
+            
+        Yields:
+            MP3 audio chunks
+            
+        Raises:
+            TTSError: If TTS generation fails
+        """
+        text = self._prepare_text(text)
+        provider = self._select_provider()
+        
+        try:
+            if provider == "openai":
+                voice_name = self._get_openai_voice(voice)
+                logger.info("🔊 Streaming OpenAI TTS audio: %d chars, voice: %s", len(text), voice_name)
+                async with self.openai_client.audio.speech.with_streaming_response.create(
+                    model="tts-1",
+                    voice=voice_name,
+                    input=text,
+                    response_format="mp3"
+                ) as response:
+                    async for chunk in response.iter_bytes():
+                        yield chunk
+            elif provider == "elevenlabs":
+                voice_name = voice or self._get_elevenlabs_voice(language)
+                logger.info("🔊 Streaming ElevenLabs TTS audio: %d chars, voice: %s", len(text), voice_name)
+                async for chunk in self.elevenlabs_client.text_to_speech.convert(
+                    text=text,
+                    voice_id=voice_name,
+                    model_id="eleven_monolingual_v1"
+                ):
+                    yield chunk
+            else:
+                logger.info("🔧 Using mock TTS stream for %d characters in %s", len(text), language)
+                yield _MOCK_MP3
+        except TTSError:
+            raise
+        except Exception as e:
+            logger.error("❌ TTS streaming failed: %s", e)
+            raise TTSError(f"TTS streaming failed: {str(e)}")
+    
+    def _prepare_text(self, text: str) -> str:
+        """Validate text and truncate it to the provider input limit."""
+        if not text or text.isspace():
             raise TTSError("Text content is required")
         
         # Limit text length to prevent abuse and long processing times
         max_length = 4096  # OpenAI limit
         if len(text) > max_length:
-            logger.warning(f"Text truncated from {len(text)} to {max_length} characters")
+            logger.warning("Text truncated from %d to %d characters", len(text), max_length)
             text = text[:max_length] + "..."
-        
-        # Determine which provider to use
+        return text
+    
+    def _select_provider(self) -> str:
+        """Pick the configured provider, falling back to mock if it is unavailable."""
         provider = settings.tts_provider.lower()
         
         if provider == "openai" and self.openai_client:
-            return await self._generate_openai_audio(text, language, voice)
+            return "openai"
         elif provider == "elevenlabs" and self.elevenlabs_client:
-            return await self._generate_elevenlabs_audio(text, language, voice)
-        else:
-            # Fall back to mock implementation
-            logger.info(f"🔧 Using mock TTS (provider: {provider}, openai: {bool(self.openai_client)}, elevenlabs: {bool(self.elevenlabs_client)})")
-            return await self._generate_mock_audio(text, language)
+            return "elevenlabs"
+        
+        logger.info("🔧 Using mock TTS (provider: %s, openai: %s, elevenlabs: %s)",
+                    provider, bool(self.openai_client), bool(self.elevenlabs_client))
+        return "mock"
+    
+    def _get_openai_voice(self, voice: Optional[str]) -> str:
+        """Get a valid OpenAI voice name, defaulting to alloy."""
+        # Use configured voice or default
+        voice_name = voice or settings.tts_voice or "alloy"
+        
+        # Validate voice name
+        if voice_name not in _OPENAI_VOICES:
+            logger.warning("Invalid OpenAI voice '%s', using 'alloy'", voice_name)
+            voice_name = "alloy"
+        return voice_name
     
     async def _generate_openai_audio(
         self, 
@@ -110,18 +220,11 @@ class TTSService:
     ) -> Tuple[str, str]:
         """Generate audio using OpenAI TTS."""
         try:
-            # Use configured voice or default
-            voice_name = voice or settings.tts_voice or "alloy"
-            
-            # Validate voice name
-            valid_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
-            if voice_name not in valid_voices:
-                logger.warning(f"Invalid OpenAI voice '{voice_name}', using 'alloy'")
-                voice_name = "alloy"
+            voice_name = self._get_openai_voice(voice)
             
-            logger.info(f"🔊 Generating OpenAI TTS audio: {len(text)} chars, voice: {voice_name}")
+            logger.info("🔊 Generating OpenAI TTS audio: %d chars, voice: %s", len(text), voice_name)
             
-            response = self.openai_client.audio.speech.create(
+            response = await self.openai_client.audio.speech.create(
                 model="tts-1",  # or "tts-1-hd" for higher quality
                 voice=voice_name,
                 input=text,
@@ -132,19 +235,20 @@ class TTSService:
             audio_data = response.content
             audio_base64 = base64.b64encode(audio_data).decode('utf-8')
             
-            logger.info(f"✅ OpenAI audio generated successfully ({len(audio_base64)} base64 chars)")
+            logger.info("✅ OpenAI audio generated successfully (%d base64 chars)", len(audio_base64))
             return audio_base64, "mp3"
             
+        except RateLimitError as e:
+            logger.error("❌ OpenAI TTS rate limited: %s", e)
+            if e.code == "insufficient_quota":
+                raise TTSRateLimitError("OpenAI TTS quota exceeded")
+            raise TTSRateLimitError("OpenAI TTS rate limit exceeded, please try again later")
+        except AuthenticationError as e:
+            logger.error("❌ OpenAI TTS authentication failed: %s", e)
+            raise TTSError("OpenAI TTS authentication failed")
         except Exception as e:
-            logger.error(f"❌ OpenAI TTS generation failed: {e}")
-            if "rate limit" in str(e).lower():
-                raise TTSError("OpenAI TTS rate limit exceeded, please try again later")
-            elif "quota" in str(e).lower():
-                raise TTSError("OpenAI TTS quota exceeded")
-            elif "api key" in str(e).lower():
-                raise TTSError("OpenAI TTS authentication failed")
-            else:
-                raise TTSError(f"OpenAI TTS generation failed: {str(e)}")
+            logger.error("❌ OpenAI TTS generation failed: %s", e)
+            raise TTSError(f"OpenAI TTS generation failed: {str(e)}")
     
     async def _generate_elevenlabs_audio(
         self, 
@@ -157,7 +261,7 @@ class TTSService:
             # Use provided voice or get default voice for language
             voice_name = voice or self._get_elevenlabs_voice(language)
             
-            logger.info(f"🔊 Generating ElevenLabs TTS audio: {len(text)} chars, voice: {voice_name}")
+            logger.info("🔊 Generating ElevenLabs TTS audio: %d chars, voice: %s", len(text), voice_name)
             
             # Generate audio using the ElevenLabs client
             response = self.elevenlabs_client.text_to_speech.convert(
@@ -166,64 +270,41 @@ class TTSService:
                 model_id="eleven_monolingual_v1"
             )
             
-            # Collect audio bytes
-            audio_data = b""
-            for chunk in response:
-                audio_data += chunk
+            # Collect audio bytes as they stream in (bytearray avoids O(n²) concat)
+            audio_data = bytearray()
+            async for chunk in response:
+                audio_data.extend(chunk)
             
             # Convert to base64
             audio_base64 = base64.b64encode(audio_data).decode('utf-8')
             
-            logger.info(f"✅ ElevenLabs audio generated successfully ({len(audio_base64)} base64 chars)")
+            logger.info("✅ ElevenLabs audio generated successfully (%d base64 chars)", len(audio_base64))
             return audio_base64, "mp3"
             
         except Exception as e:
-            logger.error(f"❌ ElevenLabs TTS generation failed: {e}")
-            if "rate limit" in str(e).lower():
-                raise TTSError("ElevenLabs TTS rate limit exceeded, please try again later")
-            elif "quota" in str(e).lower():
-                raise TTSError("ElevenLabs TTS quota exceeded")
-            elif "api key" in str(e).lower() or "unauthorized" in str(e).lower():
+            logger.error("❌ ElevenLabs TTS generation failed: %s", e)
+            # ElevenLabs' ApiError carries the HTTP status of the rejected call
+            status_code = getattr(e, "status_code", None)
+            if status_code == 429:
+                raise TTSRateLimitError("ElevenLabs TTS rate limit exceeded, please try again later")
+            elif status_code in (401, 403):
                 raise TTSError("ElevenLabs TTS authentication failed")
             else:
                 raise TTSError(f"ElevenLabs TTS generation failed: {str(e)}")
     
     def _get_elevenlabs_voice(self, language: str) -> str:
         """Get appropriate ElevenLabs voice for language."""
-        # Map language codes to ElevenLabs voice IDs (these are common pre-made voices)
-        voice_map = {
-            "en": "21m00Tcm4TlvDq8ikWAM",  # Rachel - Clear female American voice
-            "es": "VR6AewLTigWG4xSOukaG",  # Sofia - Spanish voice  
-            "fr": "XB0fDUnXU5powFXDhCwa",  # Charlotte - French voice
-            "de": "jBpfuIE2acCO8z3wKNLl",  # Gigi - German voice
-            "it": "oWAxZDx7w5VEj9dCyTzz",  # Giulia - Italian voice
-            "pt": "pMsXgVXv3BLzUgSXRplE",  # Liam - Portuguese voice
-        }
-        
-        return voice_map.get(language.lower(), "21m00Tcm4TlvDq8ikWAM")  # Default to Rachel
+        return _ELEVENLABS_VOICE_BY_LANG.get(language.lower(), _DEFAULT_ELEVENLABS_VOICE)
     
     async def _generate_mock_audio(self, text: str, language: str) -> Tuple[str, str]:
         """
         Generate mock audio for development/testing when TTS providers are unavailable.
         Returns a small MP3 file encoded as base64.
         """
-        logger.info(f"🔧 Using mock TTS for {len(text)} characters in {language}")
-        
-        # Create a minimal MP3 header for a valid but silent audio file
-        # This is a minimal MP3 frame that represents silence
-        mock_mp3_data = bytes([
-            0xFF, 0xFB, 0x90, 0x00,  # MP3 header
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,  # Padding
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-            0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-        ])
-        
-        # Encode to base64
-        audio_base64 = base64.b64encode(mock_mp3_data).decode('utf-8')
+        logger.info("🔧 Using mock TTS for %d characters in %s", len(text), language)
         
         logger.info("✅ Mock audio generated successfully")
-        return audio_base64, "mp3"
+        return _MOCK_MP3_BASE64, "mp3"
     
     def get_supported_languages(self) -> list:
         """Get list of supported language codes."""
@@ -274,7 +355,7 @@ class TTSService:
                 await self._generate_openai_audio("Hello, this is a test.", "en")
                 results["openai"]["working"] = True
             except Exception as e:
-                logger.error(f"OpenAI TTS test failed: {e}")
+                logger.error("OpenAI TTS test failed: %s", e)
         
         # Test ElevenLabs
         if self.elevenlabs_client:
@@ -283,6 +364,6 @@ class TTSService:
                 await self._generate_elevenlabs_audio("Hello, this is a test.", "en")
                 results["elevenlabs"]["working"] = True
             except Exception as e:
-                logger.error(f"ElevenLabs TTS test failed: {e}")
+                logger.error("ElevenLabs TTS test failed: %s", e)
         
         return results
\ No newline at end of file
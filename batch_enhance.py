@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Bulk story enhancement via the OpenAI Batch API.
+For backfills and other non-urgent jobs: half the cost of live calls,
+results within 24 hours.
+
+Usage:
+    python batch_enhance.py --submit items.jsonl
+    python batch_enhance.py --results <batch_id>
+
+Each input line is a JSON object with custom_id, photo_base64, transcript
+and (optionally) language.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.openai_service import OpenAIService, OpenAIError
+
+
+async def submit(path: str) -> None:
+    """Submit every item in a JSONL file as one batch."""
+    items = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            items[item["custom_id"]] = (
+                item["photo_base64"],
+                item["transcript"],
+                item.get("language", "en")
+            )
+
+    batch_id = await OpenAIService().submit_story_batch(items)
+    print(f"✅ Submitted {len(items)} enhancements as batch: {batch_id}")
+
+
+async def results(batch_id: str) -> None:
+    """Print batch results as JSONL on stdout."""
+    for custom_id, result in (await OpenAIService().retrieve_batch_results(batch_id)).items():
+        if isinstance(result, OpenAIError):
+            print(json.dumps({"custom_id": custom_id, "error": str(result)}))
+        else:
+            print(json.dumps({"custom_id": custom_id, **result.model_dump()}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--submit", metavar="JSONL", help="submit enhancements from a JSONL file")
+    group.add_argument("--results", metavar="BATCH_ID", help="print results of a completed batch")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(submit(args.submit) if args.submit else results(args.results))
+    except (OpenAIError, OSError, KeyError, json.JSONDecodeError) as e:
+        print(f"❌ Batch enhancement failed: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -1,32 +1,48 @@
 """
 Amplify Backend - Main Application Entry Point
 """
+import logging
 import os
+import anyio
+import orjson
 import uvicorn
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file once per process tree; reload and
+# worker subprocesses inherit the variables and skip re-reading the file
+if not os.environ.get("_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_DOTENV_LOADED"] = "1"
 
 from app.api.v1.router import api_router
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Database initialization using lifespan
 @asynccontextmanager
 async def lifespan(app_instance):
     """Initialize database on application startup."""
+    # Threads mostly wait on I/O, so size the pool for concurrency, not cores
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.anyio_threads
+    
     try:
         from app.core.database import create_tables
-        create_tables()
+        # Blocking DDL runs in a worker thread so the event loop stays free
+        await run_in_threadpool(create_tables)
     except Exception as e:
-        print(f"⚠️  Database initialization warning: {e}")
+        logger.warning("⚠️  Database initialization warning: %s", e)
         # Don't fail startup if database is not available
         pass
     yield
-    # Cleanup (if needed)
+    # Cleanup: close pooled connections to AI providers
+    from app.services.http_clients import close_shared_async_httpx_client
+    await close_shared_async_httpx_client()
 
 # Create FastAPI app instance
 app = FastAPI(
@@ -35,15 +51,17 @@ app = FastAPI(
     version="1.0.0",
     openapi_url="/api/v1/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson encodes straight to bytes
 )
 
 # Set up CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify actual domains
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=settings.cors_max_age,  # Let browsers skip repeat OPTIONS preflights
 )
 
 # Include API router
@@ -54,19 +72,34 @@ async def root():
     """Root endpoint"""
     return {"message": "Amplify Backend API", "status": "running"}
 
+# Constant payload, encoded once instead of on every monitoring poll
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "amplify-backend"})
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "amplify-backend"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+# Build the OpenAPI schema now that every route is registered, so the first
+# /api/v1/openapi.json request serves the cached dict instead of generating it
+app.openapi()
 
 if __name__ == "__main__":
     # Use port 5000 for Replit deployment (required for proper deployment)
     # Replit will override this with PORT environment variable
     port = int(os.getenv("PORT", 5000))
+    # The file-watching reloader is for local development only; deployments
+    # scale with worker processes instead (uvicorn ignores workers when reloading)
+    reload = os.getenv("ENV", "dev") == "dev"
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
-        reload=True,
-        log_level="info"
+        reload=reload,
+        workers=None if reload else int(os.getenv("WEB_CONCURRENCY", 1)),
+        log_level="info",
+        # uvicorn[standard] ships both; pin them instead of relying on auto-detection
+        loop="uvloop",
+        http="httptools",
+        ws="none",  # No WebSocket routes
     )
\ No newline at end of file
@@ -2,60 +2,78 @@
 Global pytest fixtures for all tests.
 """
 import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock
 from fastapi.testclient import TestClient
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
 import asyncio
-from typing import Generator
-from sqlalchemy import create_engine
+from typing import AsyncGenerator, Callable, Generator
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-import tempfile
+from sqlalchemy.pool import NullPool, QueuePool
 import os
+import sqlite3
 import sys
 import base64
-import uuid
+import weakref
+import orjson
 
 # Add project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import app
 from app.models.base import Base
-from app.core.database import get_db_session
+from app.core.database import get_db_session, get_async_db_session
+from app.api.v1.endpoints.enhancement import get_gemini_service
+from app.services.gemini_service import GeminiResponse
 
-# Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Test database setup: a named in-memory SQLite database in shared-cache
+# mode, so the sync (pysqlite) and async (aiosqlite) engines see the same data
+TEST_DATABASE_NAME = "file:amplify_test_db?mode=memory&cache=shared"
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DATABASE_NAME}&uri=true"
 
 
-@pytest.fixture(scope="session")
-def event_loop():
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+@pytest.hookimpl(optionalhook=True)
+def pytest_asyncio_loop_factories(config, item):
+    """Run async tests on uvloop, the loop uvicorn serves the app with."""
+    try:
+        import uvloop
+    except ImportError:
+        return {"asyncio": asyncio.new_event_loop}
+    return {"uvloop": uvloop.new_event_loop}
 
 
-@pytest.fixture
-def test_db():
-    """Create test database with isolation per test."""
-    
-    # Use unique temporary database for each test
-    temp_dir = tempfile.gettempdir()
-    db_name = f"test_{uuid.uuid4().hex[:8]}.db"
-    db_url = f"sqlite:///{temp_dir}/{db_name}"
-    
-    engine = create_engine(db_url, connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@pytest.fixture(scope="session")
+def test_engine():
+    """Create the in-memory test database and its tables once per session."""
+    # Keep one raw connection open: a shared-cache memory database lives
+    # only while something is connected to it
+    keepalive = sqlite3.connect(TEST_DATABASE_NAME, uri=True)
     
-    # Create tables
+    # Pool connections so sessions reuse them instead of reconnecting. Not
+    # StaticPool: the app's sessions and db_session run on different threads
+    # and must not share one connection's transaction
+    engine = create_engine(SQLALCHEMY_DATABASE_URL,
+                           connect_args={"check_same_thread": False},
+                           poolclass=QueuePool)
     Base.metadata.create_all(bind=engine)
     
-    yield TestingSessionLocal
+    yield engine
     
-    # Cleanup
     engine.dispose()
-    try:
-        os.unlink(f"{temp_dir}/{db_name}")
-    except FileNotFoundError:
-        pass
+    keepalive.close()
+
+
+@pytest.fixture
+def test_db(test_engine):
+    """Provide a session factory on the test database, emptied after each test."""
+    yield sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    
+    # Clear rows instead of recreating tables for every test
+    with test_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
 
 
 @pytest.fixture
@@ -68,58 +86,174 @@ def db_session(test_db):
         session.close()
 
 
-@pytest.fixture
-def client(test_db) -> Generator[TestClient, None, None]:
-    """Create a test client for the FastAPI app."""
-    def override_get_db():
-        try:
-            db = test_db()
-            yield db
-        finally:
-            db.close()
+@pytest.fixture(scope="session")
+def async_test_engine(test_engine):
+    """Create an aiosqlite engine on the same in-memory test database."""
+    # NullPool keeps no connections open, so there is nothing to dispose
+    engine = create_async_engine(test_engine.url.set(drivername="sqlite+aiosqlite"),
+                                 poolclass=NullPool)
     
-    app.dependency_overrides[get_db_session] = override_get_db
+    @event.listens_for(engine.sync_engine, "connect")
+    def _read_uncommitted(dbapi_connection, connection_record):
+        # Shared-cache readers otherwise hold table locks until their
+        # transaction ends, failing concurrent requests' writes
+        dbapi_connection.execute("PRAGMA read_uncommitted = 1")
     
-    with TestClient(app) as test_client:
-        yield test_client
-    
-    app.dependency_overrides.clear()
+    return engine
+
+
+@pytest.fixture
+def async_test_db(test_db, async_test_engine):
+    """Create an async session factory for the same test database."""
+    return async_sessionmaker(async_test_engine, autoflush=False, expire_on_commit=False)
 
 
 @pytest.fixture
-async def async_client(test_db) -> AsyncClient:
-    """Create an async test client for the FastAPI app."""
+async def async_db_session(async_test_db):
+    """Create async database session for testing."""
+    async with async_test_db() as session:
+        yield session
+
+
+class _SerializedCommitAsyncSession(AsyncSession):
+    """AsyncSession whose commits take turns on each event loop.
+    
+    Shared-cache SQLite fails a second concurrent writer with "database table
+    is locked" instead of waiting for the first, as a server database would;
+    the app swallows that error, so concurrent creates would be silently lost.
+    (Readers don't block writers: see async_test_engine's read_uncommitted.)
+    """
+    _commit_locks = weakref.WeakKeyDictionary()
+    
+    async def commit(self) -> None:
+        lock = self._commit_locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+        async with lock:
+            await super().commit()
+
+
+@pytest.fixture(scope="session")
+def _test_dependency_overrides(test_engine, async_test_engine):
+    """Point the app's database dependencies at the test database for the session."""
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    AsyncTestingSessionLocal = async_sessionmaker(async_test_engine, autoflush=False,
+                                                  expire_on_commit=False,
+                                                  class_=_SerializedCommitAsyncSession)
+    
     def override_get_db():
         try:
-            db = test_db()
+            db = TestingSessionLocal()
             yield db
         finally:
             db.close()
     
-    app.dependency_overrides[get_db_session] = override_get_db
-    
-    async with AsyncClient(app=app, base_url="http://test") as async_test_client:
-        yield async_test_client
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
     
+    app.dependency_overrides[get_db_session] = override_get_db
+    app.dependency_overrides[get_async_db_session] = override_get_async_db
+    yield
     app.dependency_overrides.clear()
 
 
-# Sample data fixtures matching OpenAPI specification
+@pytest.fixture(scope="session")
+def _session_client(_test_dependency_overrides) -> Generator[TestClient, None, None]:
+    """Start the app (and its lifespan) once for every test that needs a client."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def _session_async_client(_test_dependency_overrides) -> AsyncGenerator[AsyncClient, None]:
+    """Start the app's lifespan once and share one async client over it."""
+    # ASGITransport doesn't send lifespan events, so run the app's lifespan
+    # context directly (what asgi-lifespan's LifespanManager wraps)
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app),
+                               base_url="http://test") as async_test_client:
+            yield async_test_client
+
+
+@pytest.fixture
+def client(_session_client, test_db) -> TestClient:
+    """Shared test client; test_db empties the tables after each test."""
+    return _session_client
+
+
+# Canned Gemini result served by mock_gemini_service unless a test overrides it
+DEFAULT_GEMINI_RESPONSE = GeminiResponse(
+    enhanced_transcript="Once upon a time in a mystical realm, there was a brave knight named Sir Gareth who embarked on a perilous quest to save the kingdom from an ancient curse.",
+    insights={
+        "plot": "Enhanced the quest structure with specific goals and conflicts",
+        "character": "Added depth and motivation to the knight protagonist"
+    }
+)
+
+
+@pytest.fixture
+def mock_gemini_service() -> Generator[AsyncMock, None, None]:
+    """Serve an AsyncMock Gemini service to the enhancement endpoints for one test."""
+    # A fresh mock per test: attributes assigned by one test must not leak
+    mock_service = AsyncMock()
+    mock_service.enhance_story_with_photo.return_value = DEFAULT_GEMINI_RESPONSE
+    app.dependency_overrides[get_gemini_service] = lambda: mock_service
+    yield mock_service
+    app.dependency_overrides.pop(get_gemini_service, None)
+
+
+class _StubGeminiService:
+    """Replays one canned response and records call kwargs; far cheaper to build than an AsyncMock."""
+
+    def __init__(self, response: GeminiResponse):
+        self.response = response
+        self.calls = []
+
+    async def enhance_story_with_photo(self, **kwargs) -> GeminiResponse:
+        self.calls.append(kwargs)
+        return self.response
+
+
+@pytest.fixture(scope="session")
+def make_stub_gemini_service() -> Callable[[GeminiResponse], _StubGeminiService]:
+    """Build a stub Gemini service for suites that never inspect mock calls."""
+    return _StubGeminiService
+
+
 @pytest.fixture
+def async_client(_session_async_client, test_db) -> AsyncClient:
+    """Shared async test client; test_db empties the tables after each test."""
+    return _session_async_client
+
+
+# Sample data fixtures matching OpenAPI specification
+
+# A simple 1x1 pixel PNG in base64 (base64 output is pure ASCII)
+SAMPLE_IMAGE_BASE64 = base64.b64encode(
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x01\x00\x00\x00\x007n\xf9$\x00\x00\x00\nIDATx\x9cc\xf8\x00\x00\x00\x01\x00\x01\x00\x00\x00\x00\r\n\x1d\xb3\x00\x00\x00\x00IEND\xaeB`\x82'
+).decode('ascii')
+
+@pytest.fixture(scope="session")
 def sample_enhancement_request() -> dict:
-    """Sample enhancement request matching OpenAPI schema."""
-    # Create a simple 1x1 pixel PNG in base64
-    sample_image = base64.b64encode(
-        b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x01\x00\x00\x00\x007n\xf9$\x00\x00\x00\nIDATx\x9cc\xf8\x00\x00\x00\x01\x00\x01\x00\x00\x00\x00\r\n\x1d\xb3\x00\x00\x00\x00IEND\xaeB`\x82'
-    ).decode('utf-8')
-    
+    """Sample enhancement request matching OpenAPI schema (shared; don't mutate)."""
     return {
-        "photo_base64": sample_image,
+        "photo_base64": SAMPLE_IMAGE_BASE64,
         "transcript": "Once upon a time, there was a brave knight who embarked on a quest to save the kingdom.",
         "language": "en"
     }
 
 
+@pytest.fixture(scope="session")
+def sample_enhancement_body(sample_enhancement_request) -> bytes:
+    """Sample enhancement request serialized once, for posting as raw content."""
+    return orjson.dumps(sample_enhancement_request)
+
+
+@pytest.fixture
+def make_enhancement_request(sample_enhancement_request) -> Callable[..., dict]:
+    """Build an enhancement request from the sample with some fields overridden."""
+    return lambda **overrides: {**sample_enhancement_request, **overrides}
+
+
 @pytest.fixture
 def sample_google_auth_request() -> dict:
     """Sample Google OAuth request."""
@@ -1,27 +1,41 @@
 """
 Contract test configuration and fixtures.
 """
+import os
 import pytest
-from unittest.mock import patch, AsyncMock
+import yaml
+from app.api.v1.endpoints.enhancement import get_gemini_service
 from app.services.gemini_service import GeminiResponse
+from main import app
 
+OPENAPI_SPEC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "openapi.yaml")
 
-@pytest.fixture(autouse=True)
-def mock_gemini_for_contract():
+
+@pytest.fixture(scope="session")
+def openapi_spec():
+    """Load the OpenAPI specification from YAML once per test session."""
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(OPENAPI_SPEC_PATH, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=loader)
+
+
+# Contract-compliant mock response, built once for every contract test
+CONTRACT_GEMINI_RESPONSE = GeminiResponse(
+    enhanced_transcript="Once upon a time, in a mystical kingdom shrouded by ancient magic, there lived Sir Gareth the Bold, a brave knight of unwavering courage and noble heart.",
+    insights={
+        "plot": "Enhanced the basic quest narrative with specific magical conflict and clear stakes for the kingdom's salvation",
+        "character": "Added character name (Sir Gareth the Bold), personality traits (unwavering courage, noble heart), and deeper motivation",
+        "setting": "Incorporated mystical elements and ancient magic to transform the setting into a rich fantasy realm",
+        "mood": "Elevated from simple adventure story to epic fantasy tale with dramatic stakes and heroic grandeur"
+    }
+)
+
+
+# Module scope: one stub per contract file, removed before other test directories run
+@pytest.fixture(scope="module", autouse=True)
+def mock_gemini_for_contract(make_stub_gemini_service):
     """Automatically mock Gemini service for all contract tests."""
-    with patch('app.api.v1.endpoints.enhancement.GeminiService') as mock_gemini_class:
-        mock_gemini_instance = AsyncMock()
-        mock_gemini_class.return_value = mock_gemini_instance
-        
-        # Contract-compliant mock response
-        mock_response = GeminiResponse(
-            enhanced_transcript="Once upon a time, in a mystical kingdom shrouded by ancient magic, there lived Sir Gareth the Bold, a brave knight of unwavering courage and noble heart.",
-            insights={
-                "plot": "Enhanced the basic quest narrative with specific magical conflict and clear stakes for the kingdom's salvation",
-                "character": "Added character name (Sir Gareth the Bold), personality traits (unwavering courage, noble heart), and deeper motivation",
-                "setting": "Incorporated mystical elements and ancient magic to transform the setting into a rich fantasy realm",
-                "mood": "Elevated from simple adventure story to epic fantasy tale with dramatic stakes and heroic grandeur"
-            }
-        )
-        mock_gemini_instance.enhance_story_with_photo.return_value = mock_response
-        yield mock_gemini_class
\ No newline at end of file
+    stub_gemini_service = make_stub_gemini_service(CONTRACT_GEMINI_RESPONSE)
+    app.dependency_overrides[get_gemini_service] = lambda: stub_gemini_service
+    yield stub_gemini_service
+    app.dependency_overrides.pop(get_gemini_service, None)
@@ -2,34 +2,18 @@
 Contract tests validating OpenAPI specification compliance.
 """
 import pytest
-import yaml
 from fastapi import status
-from fastapi.openapi.utils import get_openapi
 from main import app
-import os
 
 
 @pytest.mark.contract
 class TestOpenAPISpecCompliance:
     """Test that API implementation matches OpenAPI specification."""
     
-    @pytest.fixture(scope="class")
-    def openapi_spec(self):
-        """Load OpenAPI specification from YAML file."""
-        spec_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "openapi.yaml")
-        
-        with open(spec_path, 'r') as f:
-            return yaml.safe_load(f)
-    
     @pytest.fixture(scope="class")
     def generated_spec(self):
-        """Get OpenAPI spec generated by FastAPI."""
-        return get_openapi(
-            title=app.title,
-            version=app.version,
-            description=app.description,
-            routes=app.routes,
-        )
+        """Get OpenAPI spec generated by FastAPI (cached on the app)."""
+        return app.openapi()
     
     def test_api_info_matches_spec(self, openapi_spec, generated_spec):
         """Test that API info matches OpenAPI specification."""
@@ -95,9 +79,9 @@ class TestOpenAPISpecCompliance:
         assert "/api/v1/enhancements" in spec_paths
         assert "/api/v1/auth/google" in spec_paths
     
-    def test_enhancement_request_schema_compliance(self, client, sample_enhancement_request):
+    def test_enhancement_request_schema_compliance(self, client, sample_enhancement_body):
         """Test that enhancement requests match OpenAPI schema."""
-        response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
+        response = client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"})
         
         # Should accept valid request matching OpenAPI schema
         assert response.status_code == status.HTTP_200_OK
@@ -118,9 +102,9 @@ class TestOpenAPISpecCompliance:
             response = client.post("/api/v1/enhancements", json=invalid_request)
             assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     
-    def test_enhancement_response_schema_compliance(self, client, sample_enhancement_request):
+    def test_enhancement_response_schema_compliance(self, client, sample_enhancement_body):
         """Test that enhancement responses match OpenAPI schema."""
-        response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
+        response = client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"})
         
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -138,10 +122,10 @@ class TestOpenAPISpecCompliance:
         # Check insights is a dictionary
         assert isinstance(data["insights"], dict)
     
-    def test_audio_response_schema_compliance(self, client, sample_enhancement_request):
+    def test_audio_response_schema_compliance(self, client, sample_enhancement_body):
         """Test that audio responses match OpenAPI schema."""
         # Create enhancement first
-        enhancement_response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
+        enhancement_response = client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"})
         enhancement_data = enhancement_response.json()
         enhancement_id = enhancement_data["enhancement_id"]
         
@@ -285,6 +269,12 @@ class TestOpenAPIDocumentation:
         assert "info" in openapi_doc
         assert "paths" in openapi_doc
     
+    def test_openapi_schema_built_at_startup(self):
+        """Test that the schema is generated once at import and reused."""
+        assert app.openapi_schema is not None
+        assert app.openapi() is app.openapi_schema
+        assert "/health" in app.openapi_schema["paths"]
+    
     def test_api_tags_consistency(self, client):
         """Test that API tags are consistent with OpenAPI spec."""
         response = client.get("/api/v1/openapi.json")
@@ -2,26 +2,37 @@
 E2E test configuration and fixtures.
 """
 import pytest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch
+from app.api.v1.endpoints.enhancement import get_gemini_service
+from app.core.config import settings
 from app.services.gemini_service import GeminiResponse
+from main import app
 
+# Standard mock response for E2E tests, built once and replayed for every request
+E2E_GEMINI_RESPONSE = GeminiResponse(
+    enhanced_transcript="In a mystical realm veiled by ancient magic, Sir Gareth the Brave, a noble knight of extraordinary courage, embarked upon a legendary quest to break the dark curse that had befallen his beloved kingdom.",
+    insights={
+        "plot": "Transformed basic quest into epic fantasy adventure with specific magical conflict",
+        "character": "Enhanced protagonist with noble title, personality traits, and emotional stakes",
+        "setting": "Added mystical realm with ancient magic to create immersive fantasy world",
+        "mood": "Elevated from simple story to grand epic with dramatic gravitas"
+    }
+)
 
-@pytest.fixture(autouse=True)
-def mock_gemini_for_e2e():
+
+# Module scope: mocks set up once per E2E file, and removed before other
+# test directories run (a session-scoped override would leak into them)
+@pytest.fixture(scope="module", autouse=True)
+def mock_gemini_for_e2e(make_stub_gemini_service):
     """Automatically mock Gemini service for all E2E tests."""
-    with patch('app.api.v1.endpoints.enhancement.GeminiService') as mock_gemini_class:
-        mock_gemini_instance = AsyncMock()
-        mock_gemini_class.return_value = mock_gemini_instance
-        
-        # Standard mock response for E2E tests
-        mock_response = GeminiResponse(
-            enhanced_transcript="In a mystical realm veiled by ancient magic, Sir Gareth the Brave, a noble knight of extraordinary courage, embarked upon a legendary quest to break the dark curse that had befallen his beloved kingdom.",
-            insights={
-                "plot": "Transformed basic quest into epic fantasy adventure with specific magical conflict",
-                "character": "Enhanced protagonist with noble title, personality traits, and emotional stakes", 
-                "setting": "Added mystical realm with ancient magic to create immersive fantasy world",
-                "mood": "Elevated from simple story to grand epic with dramatic gravitas"
-            }
-        )
-        mock_gemini_instance.enhance_story_with_photo.return_value = mock_response
-        yield mock_gemini_class
\ No newline at end of file
+    stub_gemini_service = make_stub_gemini_service(E2E_GEMINI_RESPONSE)
+    app.dependency_overrides[get_gemini_service] = lambda: stub_gemini_service
+    yield stub_gemini_service
+    app.dependency_overrides.pop(get_gemini_service, None)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def mock_tts_for_e2e():
+    """Serve canned mock audio even when TTS API keys are configured locally."""
+    with patch.object(settings, "tts_provider", "mock"):
+        yield
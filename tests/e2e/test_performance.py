@@ -0,0 +1,40 @@
+"""
+End-to-end tests for API response-time requirements.
+"""
+import pytest
+from fastapi import status
+import time
+
+# (method, path, budget in seconds) for each performance requirement
+RESPONSE_TIME_BUDGETS = {
+    # Stage 1 (text enhancement) should be fast
+    "enhancement_creation": ("POST", "/api/v1/enhancements", 5.0),
+    # Audio generation should complete within reasonable time
+    "audio_generation": ("GET", "/api/v1/enhancements/{enhancement_id}/audio", 10.0),
+    # History retrieval should be fast
+    "history_retrieval": ("GET", "/api/v1/enhancements", 1.0),
+}
+
+
+@pytest.mark.e2e
+@pytest.mark.slow
+class TestPerformanceRequirements:
+    """Test performance requirements and response times."""
+    
+    @pytest.mark.parametrize("requirement", RESPONSE_TIME_BUDGETS)
+    async def test_response_time_within_budget(self, async_client, sample_enhancement_body, requirement):
+        """Test that each endpoint responds within its time budget."""
+        method, path, budget_seconds = RESPONSE_TIME_BUDGETS[requirement]
+        
+        if "{enhancement_id}" in path:
+            # Create the enhancement first; only the dependent call is timed
+            enhancement_response = await async_client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"})
+            path = path.format(enhancement_id=enhancement_response.json()["enhancement_id"])
+        body = sample_enhancement_body if method == "POST" else None
+        
+        start_time = time.perf_counter()
+        response = await async_client.request(method, path, content=body, headers={"content-type": "application/json"})
+        response_time = time.perf_counter() - start_time
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response_time < budget_seconds
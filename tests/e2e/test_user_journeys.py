@@ -0,0 +1,139 @@
+"""
+End-to-end tests for complete user journeys.
+"""
+import asyncio
+import pytest
+from fastapi import status
+from app.schemas.enhancement import (
+    EnhancementAudioResponse, EnhancementDetails, EnhancementHistoryResponse, EnhancementTextResponse
+)
+
+
+@pytest.mark.e2e
+class TestCompleteUserJourney:
+    """Test complete user workflows from start to finish."""
+    
+    async def test_new_user_story_enhancement_journey(self, async_client, sample_google_auth_request, sample_enhancement_body):
+        """Test complete journey: Authentication -> Enhancement -> Audio -> History."""
+        
+        # Step 1: User attempts authentication (Google OAuth)
+        auth_response = await async_client.post("/api/v1/auth/google", json=sample_google_auth_request)
+        
+        # Note: Currently may fail due to fake token, but endpoint should exist
+        assert auth_response.status_code in [
+            status.HTTP_200_OK,  # If placeholder auth succeeds
+            status.HTTP_401_UNAUTHORIZED,  # If token verification fails
+            status.HTTP_422_UNPROCESSABLE_ENTITY,  # If invalid token format
+            status.HTTP_500_INTERNAL_SERVER_ERROR  # If not fully implemented
+        ]
+        
+        # For E2E testing, we'll continue even if auth fails (placeholder behavior)
+        
+        # Step 2: User creates their first story enhancement
+        enhancement_response = await async_client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"})
+        
+        assert enhancement_response.status_code == status.HTTP_200_OK
+        
+        # Verify enhancement creation (the schema also checks the enh_ ID format)
+        enhancement = EnhancementTextResponse.model_validate(enhancement_response.json())
+        enhancement_id = enhancement.enhancement_id
+        
+        # Step 3: User immediately requests audio generation (background process)
+        audio_response = await async_client.get(f"/api/v1/enhancements/{enhancement_id}/audio")
+        
+        assert audio_response.status_code == status.HTTP_200_OK
+        
+        # Verify audio generation
+        audio = EnhancementAudioResponse.model_validate(audio_response.json())
+        assert audio.audio_format == "mp3"
+        assert len(audio.audio_base64) > 0
+        
+        # Step 4: User checks their enhancement history
+        history_response = await async_client.get("/api/v1/enhancements")
+        
+        assert history_response.status_code == status.HTTP_200_OK
+        
+        # Verify history structure
+        EnhancementHistoryResponse.model_validate(history_response.json())
+        
+        # Step 5: User retrieves specific enhancement details
+        detail_response = await async_client.get(f"/api/v1/enhancements/{enhancement_id}")
+        
+        assert detail_response.status_code == status.HTTP_200_OK
+        
+        # Verify detailed information
+        details = EnhancementDetails.model_validate(detail_response.json())
+        assert details.enhancement_id == enhancement_id
+    
+    async def test_returning_user_multiple_enhancements(self, async_client, sample_enhancement_request,
+                                                         make_enhancement_request):
+        """Test returning user creating multiple enhancements."""
+        enhancement_ids = []
+        
+        # User creates multiple enhancements, one after another: concurrent
+        # writes to the shared-cache SQLite test database fail with "table is locked"
+        for i in range(3):
+            # Modify transcript slightly for each enhancement
+            request_data = make_enhancement_request(
+                transcript=f"Story {i+1}: " + sample_enhancement_request["transcript"]
+            )
+            
+            response = await async_client.post("/api/v1/enhancements", json=request_data)
+            assert response.status_code == status.HTTP_200_OK
+            enhancement_ids.append(EnhancementTextResponse.model_validate(response.json()).enhancement_id)
+        assert len(set(enhancement_ids)) == 3
+        
+        # User checks history while accessing each enhancement individually
+        history_response, *detail_responses = await asyncio.gather(
+            async_client.get("/api/v1/enhancements"),
+            *(async_client.get(f"/api/v1/enhancements/{enhancement_id}") for enhancement_id in enhancement_ids)
+        )
+        assert history_response.status_code == status.HTTP_200_OK
+        
+        for enhancement_id, detail_response in zip(enhancement_ids, detail_responses):
+            assert detail_response.status_code == status.HTTP_200_OK
+            assert detail_response.json()["enhancement_id"] == enhancement_id
+    
+    @pytest.mark.parametrize("language", ["en", "es", "fr"])
+    async def test_user_workflow_with_different_languages(self, async_client, make_enhancement_request, language):
+        """Test user workflow with different language preferences."""
+        request_data = make_enhancement_request(
+            language=language, transcript=f"Story in {language}: A tale of adventure."
+        )
+        
+        # Create enhancement in specific language
+        response = await async_client.post("/api/v1/enhancements", json=request_data)
+        assert response.status_code == status.HTTP_200_OK
+        
+        data = response.json()
+        enhancement_id = data["enhancement_id"]
+        
+        # Generate audio for this enhancement
+        audio_response = await async_client.get(f"/api/v1/enhancements/{enhancement_id}/audio")
+        assert audio_response.status_code == status.HTTP_200_OK
+    
+    async def test_user_error_recovery_workflow(self, async_client, sample_enhancement_body,
+                                                make_enhancement_request):
+        """Test user workflow with error conditions and recovery."""
+        
+        # Step 1: User makes invalid request (should fail gracefully)
+        invalid_request = make_enhancement_request(transcript="")  # Invalid empty transcript
+        
+        response = await async_client.post("/api/v1/enhancements", json=invalid_request)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        
+        # Step 2: User corrects the request and tries again
+        valid_response = await async_client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"})
+        assert valid_response.status_code == status.HTTP_200_OK
+        
+        enhancement_data = valid_response.json()
+        enhancement_id = enhancement_data["enhancement_id"]
+        
+        # Step 3: User tries to access non-existent enhancement (should handle gracefully)
+        fake_response = await async_client.get("/api/v1/enhancements/enh_nonexistent")
+        # Currently returns placeholder data, but shouldn't crash
+        assert fake_response.status_code in [status.HTTP_200_OK, status.HTTP_404_NOT_FOUND]
+        
+        # Step 4: User successfully accesses their real enhancement
+        real_response = await async_client.get(f"/api/v1/enhancements/{enhancement_id}")
+        assert real_response.status_code == status.HTTP_200_OK
@@ -1,231 +1,61 @@
 """
 End-to-end tests for complete user workflows.
 """
+import asyncio
 import pytest
-from unittest.mock import patch, AsyncMock
 from fastapi import status
-import time
-from app.services.gemini_service import GeminiResponse
+from app.schemas.enhancement import EnhancementTextResponse
+from main import app
 
-
-@pytest.mark.e2e
-class TestCompleteUserJourney:
-    """Test complete user workflows from start to finish."""
-    
-    def test_new_user_story_enhancement_journey(self, client, sample_google_auth_request, sample_enhancement_request):
-        """Test complete journey: Authentication -> Enhancement -> Audio -> History."""
-        
-        # Step 1: User attempts authentication (Google OAuth)
-        auth_response = client.post("/api/v1/auth/google", json=sample_google_auth_request)
-        
-        # Note: Currently may fail due to fake token, but endpoint should exist
-        assert auth_response.status_code in [
-            status.HTTP_200_OK,  # If placeholder auth succeeds
-            status.HTTP_401_UNAUTHORIZED,  # If token verification fails
-            status.HTTP_422_UNPROCESSABLE_ENTITY,  # If invalid token format
-            status.HTTP_500_INTERNAL_SERVER_ERROR  # If not fully implemented
-        ]
-        
-        # For E2E testing, we'll continue even if auth fails (placeholder behavior)
-        
-        # Step 2: User creates their first story enhancement
-        enhancement_response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
-        
-        assert enhancement_response.status_code == status.HTTP_200_OK
-        enhancement_data = enhancement_response.json()
-        
-        # Verify enhancement creation
-        assert "enhancement_id" in enhancement_data
-        assert "enhanced_transcript" in enhancement_data  
-        assert "insights" in enhancement_data
-        
-        enhancement_id = enhancement_data["enhancement_id"]
-        assert enhancement_id.startswith("enh_")
-        
-        # Step 3: User immediately requests audio generation (background process)
-        audio_response = client.get(f"/api/v1/enhancements/{enhancement_id}/audio")
-        
-        assert audio_response.status_code == status.HTTP_200_OK
-        audio_data = audio_response.json()
-        
-        # Verify audio generation
-        assert "audio_base64" in audio_data
-        assert "audio_format" in audio_data
-        assert audio_data["audio_format"] == "mp3"
-        assert len(audio_data["audio_base64"]) > 0
-        
-        # Step 4: User checks their enhancement history
-        history_response = client.get("/api/v1/enhancements")
-        
-        assert history_response.status_code == status.HTTP_200_OK
-        history_data = history_response.json()
-        
-        # Verify history structure
-        assert "total" in history_data
-        assert "items" in history_data
-        assert isinstance(history_data["items"], list)
-        
-        # Step 5: User retrieves specific enhancement details
-        detail_response = client.get(f"/api/v1/enhancements/{enhancement_id}")
-        
-        assert detail_response.status_code == status.HTTP_200_OK
-        detail_data = detail_response.json()
-        
-        # Verify detailed information
-        assert detail_data["enhancement_id"] == enhancement_id
-        assert "original_transcript" in detail_data
-        assert "enhanced_transcript" in detail_data
-        assert "insights" in detail_data
-        assert "audio_status" in detail_data
-    
-    def test_returning_user_multiple_enhancements(self, client, sample_enhancement_request):
-        """Test returning user creating multiple enhancements."""
-        enhancement_ids = []
-        
-        # User creates multiple enhancements
-        for i in range(3):
-            # Modify transcript slightly for each enhancement
-            request_data = sample_enhancement_request.copy()
-            request_data["transcript"] = f"Story {i+1}: " + request_data["transcript"]
-            
-            response = client.post("/api/v1/enhancements", json=request_data)
-            assert response.status_code == status.HTTP_200_OK
-            
-            data = response.json()
-            enhancement_ids.append(data["enhancement_id"])
-        
-        # Verify all enhancements were created
-        assert len(enhancement_ids) == 3
-        for enhancement_id in enhancement_ids:
-            assert enhancement_id.startswith("enh_")
-        
-        # User checks history to see all enhancements
-        history_response = client.get("/api/v1/enhancements")
-        assert history_response.status_code == status.HTTP_200_OK
-        
-        # User can access each enhancement individually
-        for enhancement_id in enhancement_ids:
-            detail_response = client.get(f"/api/v1/enhancements/{enhancement_id}")
-            assert detail_response.status_code == status.HTTP_200_OK
-            
-            detail_data = detail_response.json()
-            assert detail_data["enhancement_id"] == enhancement_id
-    
-    def test_user_workflow_with_different_languages(self, client, sample_enhancement_request):
-        """Test user workflow with different language preferences."""
-        languages = ["en", "es", "fr"]
-        
-        for language in languages:
-            request_data = sample_enhancement_request.copy()
-            request_data["language"] = language
-            request_data["transcript"] = f"Story in {language}: A tale of adventure."
-            
-            # Create enhancement in specific language
-            response = client.post("/api/v1/enhancements", json=request_data)
-            assert response.status_code == status.HTTP_200_OK
-            
-            data = response.json()
-            enhancement_id = data["enhancement_id"]
-            
-            # Generate audio for this enhancement
-            audio_response = client.get(f"/api/v1/enhancements/{enhancement_id}/audio")
-            assert audio_response.status_code == status.HTTP_200_OK
-    
-    def test_user_error_recovery_workflow(self, client, sample_enhancement_request):
-        """Test user workflow with error conditions and recovery."""
-        
-        # Step 1: User makes invalid request (should fail gracefully)
-        invalid_request = sample_enhancement_request.copy()
-        invalid_request["transcript"] = ""  # Invalid empty transcript
-        
-        response = client.post("/api/v1/enhancements", json=invalid_request)
-        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
-        
-        # Step 2: User corrects the request and tries again
-        valid_response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
-        assert valid_response.status_code == status.HTTP_200_OK
-        
-        enhancement_data = valid_response.json()
-        enhancement_id = enhancement_data["enhancement_id"]
-        
-        # Step 3: User tries to access non-existent enhancement (should handle gracefully)
-        fake_response = client.get("/api/v1/enhancements/enh_nonexistent")
-        # Currently returns placeholder data, but shouldn't crash
-        assert fake_response.status_code in [status.HTTP_200_OK, status.HTTP_404_NOT_FOUND]
-        
-        # Step 4: User successfully accesses their real enhancement
-        real_response = client.get(f"/api/v1/enhancements/{enhancement_id}")
-        assert real_response.status_code == status.HTTP_200_OK
+# Maximum-size transcript, just under the 5000 character limit
+_LARGE_TRANSCRIPT = "A" * 4999
 
 
 @pytest.mark.e2e
 class TestSystemReliability:
     """Test system reliability and performance under various conditions."""
     
-    def test_concurrent_enhancement_requests(self, client, sample_enhancement_request):
+    async def test_concurrent_enhancement_requests(self, async_client, sample_enhancement_body):
         """Test system behavior with concurrent requests."""
-        import threading
-        import queue
-        
-        results = queue.Queue()
-        
-        def make_request():
-            try:
-                response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
-                results.put(("success", response.status_code, response.json()))
-            except Exception as e:
-                results.put(("error", str(e), None))
-        
-        # Create multiple concurrent requests
-        threads = []
-        for _ in range(5):
-            thread = threading.Thread(target=make_request)
-            threads.append(thread)
-            thread.start()
-        
-        # Wait for all requests to complete
-        for thread in threads:
-            thread.join(timeout=10)  # 10 second timeout per thread
-        
-        # Check results
-        success_count = 0
-        while not results.empty():
-            result_type, status_or_error, data = results.get()
-            if result_type == "success":
-                assert status_or_error == status.HTTP_200_OK
-                assert "enhancement_id" in data
-                success_count += 1
+        # Submit all requests at once and let them interleave on the event loop
+        responses = await asyncio.gather(
+            *(async_client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"})
+              for _ in range(5))
+        )
+        
+        enhancement_ids = set()
+        for response in responses:
+            assert response.status_code == status.HTTP_200_OK
+            enhancement_ids.add(EnhancementTextResponse.model_validate(response.json()).enhancement_id)
+        assert len(enhancement_ids) == 5
         
-        # At least most requests should succeed
-        assert success_count >= 4
+        # The endpoint answers 200 even if saving fails, so read every write back
+        for enhancement_id in enhancement_ids:
+            response = await async_client.get(f"/api/v1/enhancements/{enhancement_id}")
+            assert response.status_code == status.HTTP_200_OK
     
-    def test_large_request_handling(self, client, sample_enhancement_request):
+    async def test_large_request_handling(self, async_client, make_enhancement_request):
         """Test handling of large requests within limits."""
         # Test with maximum allowed transcript size
-        large_request = sample_enhancement_request.copy()
-        large_request["transcript"] = "A" * 4999  # Just under the 5000 limit
+        large_request = make_enhancement_request(transcript=_LARGE_TRANSCRIPT)
         
-        response = client.post("/api/v1/enhancements", json=large_request)
+        response = await async_client.post("/api/v1/enhancements", json=large_request)
         assert response.status_code == status.HTTP_200_OK
-        
-        data = response.json()
-        assert "enhancement_id" in data
-        assert "enhanced_transcript" in data
+        EnhancementTextResponse.model_validate(response.json())
     
-    def test_system_health_during_load(self, client, sample_enhancement_request):
+    async def test_system_health_during_load(self, async_client, sample_enhancement_body):
         """Test that health checks work during system load."""
-        # Make several enhancement requests
-        for _ in range(3):
-            client.post("/api/v1/enhancements", json=sample_enhancement_request)
-        
-        # Health check should still work
-        health_response = client.get("/health")
+        # Health check should still work while an enhancement is in flight
+        _, health_response = await asyncio.gather(
+            async_client.post("/api/v1/enhancements", content=sample_enhancement_body, headers={"content-type": "application/json"}),
+            async_client.get("/health"),
+        )
         assert health_response.status_code == status.HTTP_200_OK
         
         health_data = health_response.json()
         assert health_data["status"] == "healthy"
     
-    def test_api_endpoint_consistency(self, client):
+    async def test_api_endpoint_consistency(self, async_client):
         """Test that all API endpoints are consistently available."""
         endpoints_to_test = [
             ("/", "GET"),
@@ -234,70 +64,20 @@ class TestSystemReliability:
             ("/api/v1/enhancements", "POST"),
         ]
         
+        # Endpoint should exist (not 404): check the route table, not over HTTP
+        registered = {
+            (route.path, method)
+            for route in app.routes
+            for method in getattr(route, "methods", None) or ()
+        }
         for endpoint, method in endpoints_to_test:
-            if method == "GET":
-                response = client.get(endpoint)
-            elif method == "POST":
-                # Use sample data for POST requests
-                if "enhancements" in endpoint:
-                    response = client.post(endpoint, json={"photo_base64": "fake", "transcript": "test"})
-                else:
-                    response = client.post(endpoint, json={})
-            
-            # Endpoint should exist (not 404) and not crash (not 500)
+            assert (endpoint, method) in registered
+        
+        # Database-backed endpoints should also not crash (not 500)
+        responses = await asyncio.gather(
+            async_client.get("/api/v1/enhancements"),
+            async_client.post("/api/v1/enhancements", json={"photo_base64": "fake", "transcript": "test"}),
+        )
+        for response in responses:
             assert response.status_code != status.HTTP_404_NOT_FOUND
             assert response.status_code != status.HTTP_500_INTERNAL_SERVER_ERROR
-
-
-@pytest.mark.e2e
-@pytest.mark.slow
-class TestPerformanceRequirements:
-    """Test performance requirements and response times."""
-    
-    def test_enhancement_creation_performance(self, client, sample_enhancement_request):
-        """Test that enhancement creation meets performance requirements."""
-        start_time = time.time()
-        
-        response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
-        
-        end_time = time.time()
-        response_time = end_time - start_time
-        
-        assert response.status_code == status.HTTP_200_OK
-        
-        # Stage 1 (text enhancement) should be fast (under 5 seconds)
-        assert response_time < 5.0
-    
-    def test_audio_generation_performance(self, client, sample_enhancement_request):
-        """Test audio generation performance."""
-        # Create enhancement first
-        enhancement_response = client.post("/api/v1/enhancements", json=sample_enhancement_request)
-        enhancement_data = enhancement_response.json()
-        enhancement_id = enhancement_data["enhancement_id"]
-        
-        # Time audio generation
-        start_time = time.time()
-        
-        audio_response = client.get(f"/api/v1/enhancements/{enhancement_id}/audio")
-        
-        end_time = time.time()
-        response_time = end_time - start_time
-        
-        assert audio_response.status_code == status.HTTP_200_OK
-        
-        # Audio generation should complete within reasonable time (under 10 seconds)
-        assert response_time < 10.0
-    
-    def test_history_retrieval_performance(self, client):
-        """Test that history retrieval is performant."""
-        start_time = time.time()
-        
-        response = client.get("/api/v1/enhancements")
-        
-        end_time = time.time()
-        response_time = end_time - start_time
-        
-        assert response.status_code == status.HTTP_200_OK
-        
-        # History retrieval should be fast (under 1 second)
-        assert response_time < 1.0
\ No newline at end of file
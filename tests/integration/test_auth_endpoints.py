@@ -3,6 +3,7 @@ Integration tests for authentication endpoints.
 """
 import pytest
 from fastapi import status
+from sqlalchemy.exc import IntegrityError
 from app.models.user import User
 
 
@@ -90,7 +91,7 @@ class TestAuthEndpoints:
         # Create user directly in database
         user = User(**sample_user_data)
         db_session.add(user)
-        db_session.commit()
+        db_session.flush()  # Send the INSERT without committing the transaction
         
         # Verify user was saved
         saved_user = db_session.query(User).filter_by(user_id="usr_test123").first()
@@ -110,8 +111,8 @@ class TestAuthEndpoints:
         )
         db_session.add(duplicate_user)
         
-        with pytest.raises(Exception):  # Should fail due to unique constraint
-            db_session.commit()
+        with pytest.raises(IntegrityError):  # Should fail due to unique constraint
+            db_session.flush()
         
         db_session.rollback()
     
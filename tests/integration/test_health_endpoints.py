@@ -1,6 +1,7 @@
 """
 Integration tests for health check endpoints.
 """
+import anyio
 import pytest
 from fastapi import status
 
@@ -20,6 +21,50 @@ class TestHealthEndpoints:
         assert "status" in data
         assert data["status"] == "healthy"
     
+    def test_responses_use_orjson(self, client):
+        """Test that JSON endpoints are rendered by the ORJSON response class."""
+        from fastapi.responses import ORJSONResponse
+        from main import app
+        
+        response = client.get("/health")
+        health_route = next(route for route in app.routes if getattr(route, "path", None) == "/health")
+        
+        assert health_route.response_class is ORJSONResponse
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == b'{"status":"healthy","service":"amplify-backend"}'
+    
+    def test_versioned_health_endpoints(self, client):
+        """Test the pre-encoded /api/v1/health payloads."""
+        response = client.get("/api/v1/health/")
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == {"status": "healthy", "service": "amplify-backend"}
+        
+        response = client.get("/api/v1/health/detailed")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["version"] == "1.0.0"
+    
+    def test_threadpool_limit_raised_at_startup(self, client):
+        """Test that the lifespan sizes the AnyIO worker thread limiter."""
+        from app.core.config import settings
+        
+        async def total_tokens():
+            return anyio.to_thread.current_default_thread_limiter().total_tokens
+        
+        assert client.portal.call(total_tokens) == settings.anyio_threads
+    
+    def test_cors_preflight_is_cacheable(self, client):
+        """Test that CORS preflight responses advertise a max age."""
+        response = client.options(
+            "/api/v1/enhancements",
+            headers={
+                "Origin": "https://app.example.com",
+                "Access-Control-Request-Method": "POST",
+            },
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["access-control-max-age"] == "86400"
+    
     def test_root_endpoint(self, client):
         """Test root endpoint health check."""
         response = client.get("/")
@@ -65,47 +110,53 @@ class TestHealthEndpoints:
             assert "status" in data
             assert "services" in data
     
-    def test_health_endpoints_http_methods(self, client):
+    @pytest.mark.parametrize("method", ["post", "put", "delete"])
+    def test_health_endpoints_http_methods(self, client, method):
         """Test that health endpoints only accept GET method."""
-        # GET should work
-        response = client.get("/health")
-        assert response.status_code == status.HTTP_200_OK
-        
-        # POST should not be allowed
-        response = client.post("/health")
-        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
-        
-        # PUT should not be allowed
-        response = client.put("/health")
-        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
-        
-        # DELETE should not be allowed
-        response = client.delete("/health")
+        response = client.request(method, "/health")
         assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
     
     def test_health_check_response_time(self, client):
         """Test that health checks respond quickly."""
         import time
         
-        start_time = time.time()
-        response = client.get("/health")
-        end_time = time.time()
+        # Warm up first so one-off setup cost isn't counted
+        client.get("/health")
         
-        response_time = end_time - start_time
+        start_time = time.perf_counter_ns()
+        response = client.get("/health")
+        response_time_ms = (time.perf_counter_ns() - start_time) / 1e6
         
         assert response.status_code == status.HTTP_200_OK
         # Health checks should be fast (under 1 second)
-        assert response_time < 1.0
+        assert response_time_ms < 1000
+    
+    def test_health_check_median_response_time(self, client):
+        """Test that the median of repeated health checks stays fast."""
+        import statistics
+        import time
+        
+        client.get("/health")
+        
+        timings_ms = []
+        for _ in range(50):
+            start_time = time.perf_counter_ns()
+            client.get("/health")
+            timings_ms.append((time.perf_counter_ns() - start_time) / 1e6)
+        
+        # The median ignores one-off scheduler or GC stalls under CI load
+        assert statistics.median(timings_ms) < 20
     
     def test_health_check_no_side_effects(self, client):
         """Test that health checks don't cause side effects."""
-        # Make multiple health check calls
-        for _ in range(5):
-            response = client.get("/health")
-            assert response.status_code == status.HTTP_200_OK
-            
-            data = response.json()
-            assert data["status"] == "healthy"
+        # Two calls are enough to show repeated checks give the same answer
+        first_response = client.get("/health")
+        second_response = client.get("/health")
+        
+        assert first_response.status_code == status.HTTP_200_OK
+        assert second_response.status_code == status.HTTP_200_OK
+        assert first_response.json()["status"] == "healthy"
+        assert first_response.json() == second_response.json()
         
         # Health checks should be idempotent
         # Verify system is still in same state
@@ -179,6 +179,15 @@ class TestAIServiceFactory:
             openai_caps = factory.get_provider_capabilities("openai")
             assert openai_caps["supports_vision"] is False
 
+    def test_get_provider_capabilities_returns_copies(self):
+        """Test that memoized capabilities can't be mutated through the result."""
+        factory = AIServiceFactory()
+
+        gemini_caps = factory.get_provider_capabilities("gemini")
+        gemini_caps["supports_vision"] = False
+
+        assert factory.get_provider_capabilities("gemini")["supports_vision"] is True
+
     def test_get_provider_capabilities_invalid_provider(self):
         """Test getting capabilities for invalid provider."""
         factory = AIServiceFactory()
@@ -4,7 +4,14 @@ Unit tests for Gemini story enhancement service.
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 import base64
-from app.services.gemini_service import GeminiService, GeminiError, GeminiResponse
+import io
+import json
+from PIL import Image
+from google.api_core import exceptions as google_exceptions
+from app.services.gemini_service import (
+    GeminiService, GeminiError, GeminiRateLimitError, GeminiResponse,
+    MAX_IMAGE_DIMENSION, TranscriptStreamParser
+)
 from app.services.prompt_manager import PromptTemplate
 
 
@@ -113,6 +120,19 @@ class TestGeminiService:
                     language="en"
                 )
 
+    async def test_call_gemini_api_resource_exhausted(self, gemini_service, sample_photo_base64, sample_transcript):
+        """Test that Gemini quota errors raise GeminiRateLimitError."""
+        gemini_service.model.generate_content.side_effect = \
+            google_exceptions.ResourceExhausted("Quota exceeded")
+
+        with patch.object(gemini_service, '_prepare_image'), \
+             pytest.raises(GeminiRateLimitError):
+            await gemini_service.enhance_story_with_photo(
+                photo_base64=sample_photo_base64,
+                transcript=sample_transcript,
+                language="en"
+            )
+
     async def test_enhance_story_invalid_response_format(self, gemini_service, sample_photo_base64, sample_transcript):
         """Test handling of invalid response format from Gemini."""
         with patch.object(gemini_service, '_call_gemini_api', new_callable=AsyncMock) as mock_api:
@@ -125,6 +145,89 @@ class TestGeminiService:
                     language="en"
                 )
 
+    def test_parse_response_rejects_non_object_insights(self, gemini_service):
+        """Test that insights must be an object in the Gemini response."""
+        with pytest.raises(GeminiError, match="Invalid response format"):
+            gemini_service._parse_response({
+                "enhanced_transcript": "Enhanced story",
+                "insights": ["not", "an", "object"]
+            })
+
+    def test_prepare_image_flattens_transparency(self, gemini_service):
+        """Test that transparent images are converted to RGB."""
+        buffer = io.BytesIO()
+        Image.new('RGBA', (4, 4), (255, 0, 0, 0)).save(buffer, format='PNG')
+        photo_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+        image = gemini_service._prepare_image(photo_base64)
+
+        assert image.mode == 'RGB'
+        assert image.getpixel((0, 0)) == (255, 255, 255)
+
+    def test_prepare_image_downscales_large_photo(self, gemini_service):
+        """Test that oversized images are downscaled before upload."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (MAX_IMAGE_DIMENSION * 2, 10)).save(buffer, format='PNG')
+        photo_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+        image = gemini_service._prepare_image(photo_base64)
+
+        assert max(image.size) == MAX_IMAGE_DIMENSION
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 16])
+    def test_transcript_stream_parser_handles_split_chunks(self, chunk_size):
+        """Test that transcript text survives arbitrary chunk boundaries."""
+        transcript = 'Sir "Gareth"\nsmiled \u00e9 \U0001F600 \\ done'
+        raw = "```json\n" + json.dumps(
+            {"enhanced_transcript": transcript, "insights": {"plot": "x"}}
+        ) + "\n```"
+
+        parser = TranscriptStreamParser()
+        streamed = "".join(
+            parser.feed(raw[i:i + chunk_size]) for i in range(0, len(raw), chunk_size)
+        )
+
+        assert streamed == transcript
+        assert parser.done
+
+    async def test_enhance_story_stream_yields_fragments(self, gemini_service, sample_photo_base64, sample_transcript):
+        """Test that streamed Gemini chunks are yielded as transcript fragments."""
+        chunks = ['{"enhanced_transcript": "Once upon', ' a time", "insights": {}}']
+
+        async def stream():
+            for text in chunks:
+                yield Mock(text=text)
+
+        gemini_service.model.generate_content_async = AsyncMock(return_value=stream())
+
+        with patch.object(gemini_service, '_prepare_image'):
+            fragments = [
+                fragment async for fragment in gemini_service.enhance_story_with_photo_stream(
+                    photo_base64=sample_photo_base64,
+                    transcript=sample_transcript,
+                    language="en"
+                )
+            ]
+
+        assert fragments == ["Once upon", " a time"]
+        assert gemini_service.model.generate_content_async.call_args[1]["stream"] is True
+
+    async def test_enhance_story_stream_without_transcript_raises(self, gemini_service, sample_photo_base64, sample_transcript):
+        """Test that a stream lacking enhanced_transcript is rejected."""
+        async def stream():
+            yield Mock(text='{"insights": {}}')
+
+        gemini_service.model.generate_content_async = AsyncMock(return_value=stream())
+
+        with patch.object(gemini_service, '_prepare_image'), \
+             pytest.raises(GeminiError, match="Invalid response format"):
+            async for _ in gemini_service.enhance_story_with_photo_stream(
+                photo_base64=sample_photo_base64,
+                transcript=sample_transcript,
+                language="en"
+            ):
+                pass
+
     def test_validate_inputs_success(self, gemini_service, sample_photo_base64, sample_transcript):
         """Test input validation with valid inputs."""
         # Should not raise any exceptions
@@ -152,6 +255,19 @@ class TestGeminiService:
                 language="en"
             )
 
+    @pytest.mark.parametrize("photo,transcript,message", [
+        (" \n\t", "A story", "Photo data is required"),
+        ("aGVsbG8=", "   ", "Transcript is required"),
+    ])
+    def test_validate_inputs_whitespace_only(self, gemini_service, photo, transcript, message):
+        """Test that whitespace-only photo or transcript is rejected."""
+        with pytest.raises(GeminiError, match=message):
+            gemini_service._validate_inputs(
+                photo_base64=photo,
+                transcript=transcript,
+                language="en"
+            )
+
     def test_validate_inputs_invalid_language(self, gemini_service, sample_photo_base64, sample_transcript):
         """Test input validation with invalid language code."""
         with pytest.raises(GeminiError, match="Invalid language code"):
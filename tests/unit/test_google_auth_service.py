@@ -0,0 +1,203 @@
+"""
+Unit tests for Google OAuth authentication service.
+"""
+import base64
+import json
+import pytest
+from unittest.mock import Mock, patch
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from datetime import datetime, timedelta, timezone
+from app.models.user import User
+from app.services import google_auth_service
+from app.services.google_auth_service import (
+    GoogleAuthService, GoogleAuthError, clear_certs_cache, CERTS_CACHE_TTL_SECONDS
+)
+
+
+@pytest.mark.unit
+class TestGetOrCreateUser:
+    """Test user lookup/creation on login."""
+
+    @pytest.fixture
+    def auth_service(self):
+        """Create GoogleAuthService without fetching Google certificates."""
+        with patch.object(GoogleAuthService, '_load_google_certs'):
+            return GoogleAuthService()
+
+    @pytest.fixture
+    def token_info(self, sample_user_data):
+        """Verified token payload matching sample_user_data."""
+        return {
+            "sub": sample_user_data["google_id"],
+            "email": sample_user_data["email"],
+            "name": sample_user_data["name"],
+            "picture": sample_user_data["picture"]
+        }
+
+    @pytest.fixture
+    def existing_user(self, db_session, sample_user_data):
+        """User who logged in a moment ago."""
+        user = User(
+            **sample_user_data,
+            last_login=datetime.now(timezone.utc).replace(tzinfo=None)
+        )
+        db_session.add(user)
+        db_session.commit()
+        return user
+
+    async def test_new_user_stores_naive_utc_last_login(self, auth_service, token_info, async_db_session):
+        """Test that new users get a naive UTC last_login."""
+        user = await auth_service.get_or_create_user(token_info, async_db_session)
+
+        assert user.last_login.tzinfo is None
+        assert abs(datetime.now(timezone.utc).replace(tzinfo=None) - user.last_login) < timedelta(minutes=1)
+
+    async def test_repeat_login_skips_update(self, auth_service, token_info, db_session, async_db_session, existing_user):
+        """Test that an unchanged repeat login does not commit."""
+        with patch.object(async_db_session, 'commit', wraps=async_db_session.commit) as mock_commit:
+            user = await auth_service.get_or_create_user(token_info, async_db_session)
+
+        assert user.user_id == existing_user.user_id
+        mock_commit.assert_not_called()
+
+    async def test_changed_profile_is_updated(self, auth_service, token_info, db_session, async_db_session, existing_user):
+        """Test that a changed name/picture is written."""
+        token_info.update(name="New Name", picture="https://example.com/new.jpg")
+
+        with patch.object(async_db_session, 'commit', wraps=async_db_session.commit) as mock_commit:
+            user = await auth_service.get_or_create_user(token_info, async_db_session)
+
+        mock_commit.assert_called_once()
+        assert user.name == "New Name"
+        assert user.picture == "https://example.com/new.jpg"
+
+    async def test_stale_last_login_is_updated(self, auth_service, token_info, db_session, async_db_session, existing_user):
+        """Test that an old last_login is refreshed."""
+        stale = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=1)
+        existing_user.last_login = stale
+        db_session.commit()
+
+        with patch.object(async_db_session, 'commit', wraps=async_db_session.commit) as mock_commit:
+            user = await auth_service.get_or_create_user(token_info, async_db_session)
+
+        mock_commit.assert_called_once()
+        assert user.last_login > stale
+        assert user.last_login.tzinfo is None
+
+
+@pytest.mark.unit
+class TestTokenKeyId:
+    """Test key ID extraction from ID token headers."""
+
+    @staticmethod
+    def _token(header: bytes, pad: bool = False) -> str:
+        """Build a token-shaped string around a raw JSON header."""
+        encoded = base64.urlsafe_b64encode(header).decode('ascii')
+        if not pad:
+            encoded = encoded.rstrip("=")
+        return f"{encoded}.payload.signature"
+
+    def test_key_id_from_unpadded_header(self):
+        """Test that headers without base64 padding are decoded."""
+        token = self._token(b'{"alg":"RS256","kid":"abc"}')
+        assert "=" not in token.split(".")[0]
+
+        assert GoogleAuthService._get_key_id(token) == "abc"
+
+    def test_key_id_from_padded_header(self):
+        """Test that padded headers are decoded too."""
+        token = self._token(b'{"alg":"RS256","kid":"abcd"}', pad=True)
+
+        assert GoogleAuthService._get_key_id(token) == "abcd"
+
+    @pytest.mark.parametrize("token", [
+        "",
+        "not-a-jwt",
+        "!!!.payload.signature",
+        "bm90IGpzb24.payload.signature",
+    ])
+    def test_malformed_header_returns_none(self, token):
+        """Test that undecodable headers yield no key ID."""
+        assert GoogleAuthService._get_key_id(token) is None
+
+    def test_non_ascii_header_returns_none(self):
+        """Test that non-ASCII token headers are rejected."""
+        assert GoogleAuthService._get_key_id("ünïcødé.payload.signature") is None
+
+    @pytest.mark.parametrize("header", [
+        b'["kid"]',
+        b'{"alg":"RS256"}',
+        b'{"kid":["x"]}',
+        b'{"kid":123}',
+    ])
+    def test_non_string_kid_returns_none(self, header):
+        """Test that missing or non-string kids yield no key ID."""
+        assert GoogleAuthService._get_key_id(self._token(header)) is None
+
+    async def test_unknown_kid_rejected(self):
+        """Test that a kid missing from Google's keys is rejected."""
+        with patch.object(GoogleAuthService, '_load_google_certs'):
+            service = GoogleAuthService()
+        service.google_certs = {"keys": []}
+        service.public_keys = {}
+
+        with pytest.raises(GoogleAuthError, match="Public key not found"):
+            await service._verify_token_production(self._token(b'{"kid":"rotated"}'))
+
+
+@pytest.mark.unit
+class TestGoogleCertsCache:
+    """Test the process-wide Google certificates cache."""
+
+    @pytest.fixture(autouse=True)
+    def reset_cache(self):
+        """Start and finish each test with an empty certificates cache."""
+        clear_certs_cache()
+        yield
+        clear_certs_cache()
+
+    @pytest.fixture
+    def certs_response(self):
+        """Mock JWKS response with a single RSA key."""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+        jwk["kid"] = "key-1"
+        response = Mock()
+        response.json.return_value = {"keys": [jwk]}
+        return response
+
+    def test_certs_shared_across_instances(self, certs_response):
+        """Test that a second instance reuses the first instance's keys."""
+        with patch.object(google_auth_service.requests, 'get', return_value=certs_response) as mock_get:
+            first = GoogleAuthService()
+            second = GoogleAuthService()
+
+        mock_get.assert_called_once()
+        assert "key-1" in second.public_keys
+        assert second.public_keys is first.public_keys
+
+    def test_certs_refetched_after_ttl(self, certs_response):
+        """Test that stale certificates are fetched again."""
+        with patch.object(google_auth_service.requests, 'get', return_value=certs_response) as mock_get, \
+             patch.object(google_auth_service.time, 'monotonic', return_value=1000.0) as mock_clock:
+            GoogleAuthService()
+            mock_clock.return_value = 1000.0 + CERTS_CACHE_TTL_SECONDS + 1
+            GoogleAuthService()
+
+        assert mock_get.call_count == 2
+
+    def test_failed_refresh_keeps_cached_keys(self, certs_response):
+        """Test that a failed refresh keeps serving the last good keys."""
+        with patch.object(google_auth_service.requests, 'get', return_value=certs_response) as mock_get, \
+             patch.object(google_auth_service.time, 'monotonic', return_value=1000.0) as mock_clock:
+            GoogleAuthService()
+            mock_get.side_effect = Exception("network down")
+            mock_clock.return_value = 1000.0 + CERTS_CACHE_TTL_SECONDS + 1
+            refreshed = GoogleAuthService()
+            # The failure backs off further fetches
+            GoogleAuthService()
+
+        assert mock_get.call_count == 2
+        assert "key-1" in refreshed.public_keys
+        assert refreshed.google_certs is not None
@@ -1,10 +1,18 @@
 """
 Unit tests for OpenAI story enhancement service.
 """
+import asyncio
+import json
+import httpx
+import openai
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 import base64
-from app.services.openai_service import OpenAIService, OpenAIError
+from app.services.openai_service import (
+    OpenAIService, OpenAIError, OpenAIRateLimitError, _TRANSCRIPT_SENTINEL
+)
+from app.services.prompt_manager import PromptTemplate, prompt_manager
+from app.services.http_clients import get_shared_async_httpx_client
 from app.schemas.ai_response import AIResponse
 from app.services.ai_service_interface import AIStoryEnhancementService
 
@@ -18,7 +26,7 @@ class TestOpenAIService:
         """Create OpenAIService instance for testing."""
         with patch('app.services.openai_service.openai') as mock_openai:
             mock_client = Mock()
-            mock_openai.OpenAI.return_value = mock_client
+            mock_openai.AsyncOpenAI.return_value = mock_client
             return OpenAIService(api_key="test_api_key", model="gpt-4-vision-preview")
 
     @pytest.fixture
@@ -55,13 +63,24 @@ class TestOpenAIService:
         """Test OpenAI service initialization with API key."""
         with patch('app.services.openai_service.openai') as mock_openai:
             mock_client = Mock()
-            mock_openai.OpenAI.return_value = mock_client
+            mock_openai.AsyncOpenAI.return_value = mock_client
 
             service = OpenAIService(api_key="test_key", model="gpt-4")
 
-            mock_openai.OpenAI.assert_called_once_with(api_key="test_key")
+            mock_openai.AsyncOpenAI.assert_called_once_with(
+                api_key="test_key", http_client=get_shared_async_httpx_client()
+            )
             assert service.model == "gpt-4"
 
+    def test_openai_services_share_http_client(self):
+        """Test that OpenAI service instances reuse one connection pool."""
+        with patch('app.services.openai_service.openai') as mock_openai:
+            OpenAIService(api_key="test_key", model="gpt-4")
+            OpenAIService(api_key="test_key", model="gpt-4")
+
+            first, second = mock_openai.AsyncOpenAI.call_args_list
+            assert first[1]["http_client"] is second[1]["http_client"]
+
     def test_openai_service_initialization_without_api_key_raises_error(self):
         """Test that OpenAI service raises error when no API key provided."""
         with patch.dict('os.environ', {}, clear=True):
@@ -98,7 +117,7 @@ class TestOpenAIService:
         mock_response.choices[0].message = Mock()
         mock_response.choices[0].message.content = '```json\n' + str(expected_openai_response).replace("'", '"') + '\n```'
 
-        openai_service.client.chat.completions.create = Mock(return_value=mock_response)
+        openai_service.client.chat.completions.create = AsyncMock(return_value=mock_response)
 
         result = await openai_service.enhance_story_with_photo(
             photo_base64=sample_photo_base64,
@@ -116,11 +135,28 @@ class TestOpenAIService:
         call_args = openai_service.client.chat.completions.create.call_args[1]
         assert "vision" in str(call_args).lower() or len(call_args["messages"][0]["content"]) > 1
 
+    async def test_enhance_story_sends_prompt_cache_key(self, openai_service, sample_photo_base64, sample_transcript, expected_openai_response):
+        """Test that requests carry a template/language prompt cache key."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = json.dumps(expected_openai_response)
+        openai_service.client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+        await openai_service.enhance_story_with_photo(
+            photo_base64=sample_photo_base64,
+            transcript=sample_transcript,
+            language="es"
+        )
+
+        version = prompt_manager.get_prompt("social").version
+        call_args = openai_service.client.chat.completions.create.call_args[1]
+        assert call_args["extra_body"] == {"prompt_cache_key": f"amplify-social-es-{version}"}
+
     async def test_enhance_story_with_photo_text_only_fallback(self, sample_photo_base64, sample_transcript):
         """Test fallback to text-only processing when vision is not available."""
         with patch('app.services.openai_service.openai') as mock_openai:
             mock_client = Mock()
-            mock_openai.OpenAI.return_value = mock_client
+            mock_openai.AsyncOpenAI.return_value = mock_client
 
             service = OpenAIService(api_key="test_key", model="gpt-4")  # Text-only model
 
@@ -129,7 +165,7 @@ class TestOpenAIService:
             mock_response.choices[0].message = Mock()
             mock_response.choices[0].message.content = '{"enhanced_transcript": "Enhanced story", "insights": {"test": "insight"}}'
 
-            service.client.chat.completions.create = Mock(return_value=mock_response)
+            service.client.chat.completions.create = AsyncMock(return_value=mock_response)
 
             result = await service.enhance_story_with_photo(
                 photo_base64=sample_photo_base64,
@@ -143,9 +179,51 @@ class TestOpenAIService:
 
     async def test_enhance_story_with_photo_api_error(self, openai_service, sample_photo_base64, sample_transcript):
         """Test handling of OpenAI API errors."""
-        openai_service.client.chat.completions.create = Mock(side_effect=Exception("API rate limit exceeded"))
+        openai_service.client.chat.completions.create = AsyncMock(side_effect=Exception("API rate limit exceeded"))
 
-        with pytest.raises(OpenAIError, match="OpenAI API call failed"):
+        with pytest.raises(OpenAIError, match="OpenAI API call failed") as exc_info:
+            await openai_service.enhance_story_with_photo(
+                photo_base64=sample_photo_base64,
+                transcript=sample_transcript,
+                language="en"
+            )
+        assert str(exc_info.value.__cause__) == "API rate limit exceeded"
+
+    async def test_enhance_story_with_photo_non_object_json(self, openai_service, sample_photo_base64, sample_transcript):
+        """Test that a JSON array response is rejected as an invalid format."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '["not", "an", "object"]'
+        openai_service.client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+        with pytest.raises(OpenAIError, match="expected a JSON object"):
+            await openai_service.enhance_story_with_photo(
+                photo_base64=sample_photo_base64,
+                transcript=sample_transcript,
+                language="en"
+            )
+
+    async def test_enhance_story_with_photo_malformed_insights(self, openai_service, sample_photo_base64, sample_transcript):
+        """Test that insights values failing schema validation raise OpenAIError."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '{"enhanced_transcript": "A story", "insights": {"a": 1}}'
+        openai_service.client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+        with pytest.raises(OpenAIError, match="Invalid response format"):
+            await openai_service.enhance_story_with_photo(
+                photo_base64=sample_photo_base64,
+                transcript=sample_transcript,
+                language="en"
+            )
+
+    async def test_enhance_story_with_photo_rate_limit_error(self, openai_service, sample_photo_base64, sample_transcript):
+        """Test that OpenAI rate limits raise OpenAIRateLimitError."""
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        error = openai.RateLimitError("slow down", response=httpx.Response(429, request=request), body=None)
+        openai_service.client.chat.completions.create = AsyncMock(side_effect=error)
+
+        with pytest.raises(OpenAIRateLimitError, match="rate limit exceeded"):
             await openai_service.enhance_story_with_photo(
                 photo_base64=sample_photo_base64,
                 transcript=sample_transcript,
@@ -159,7 +237,7 @@ class TestOpenAIService:
         mock_response.choices[0].message = Mock()
         mock_response.choices[0].message.content = "This is not valid JSON"
 
-        openai_service.client.chat.completions.create = Mock(return_value=mock_response)
+        openai_service.client.chat.completions.create = AsyncMock(return_value=mock_response)
 
         with pytest.raises(OpenAIError, match="Could not extract valid JSON"):
             await openai_service.enhance_story_with_photo(
@@ -168,6 +246,95 @@ class TestOpenAIService:
                 language="en"
             )
 
+    async def test_enhance_story_batch_preserves_order_and_errors(self, openai_service):
+        """Test that batch results line up with inputs and failures are returned."""
+        async def enhance(photo_base64, transcript, language):
+            if transcript == "bad":
+                raise OpenAIError("OpenAI API call failed: boom")
+            return AIResponse(enhanced_transcript=transcript.upper(), insights={})
+
+        with patch.object(openai_service, 'enhance_story_with_photo', side_effect=enhance):
+            results = await openai_service.enhance_story_batch([
+                ("photo", "one", "en"),
+                ("photo", "bad", "en"),
+                ("photo", "two", "es"),
+            ])
+
+        assert results[0].enhanced_transcript == "ONE"
+        assert isinstance(results[1], OpenAIError)
+        assert results[2].enhanced_transcript == "TWO"
+
+    async def test_enhance_story_batch_limits_concurrency(self, openai_service):
+        """Test that no more than max_concurrency calls run at once."""
+        in_flight = 0
+        peak = 0
+
+        async def enhance(photo_base64, transcript, language):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return AIResponse(enhanced_transcript=transcript, insights={})
+
+        with patch.object(openai_service, 'enhance_story_with_photo', side_effect=enhance):
+            await openai_service.enhance_story_batch(
+                [("photo", str(i), "en") for i in range(10)], max_concurrency=3
+            )
+
+        assert peak == 3
+
+    async def test_submit_story_batch_uploads_jsonl(self, openai_service, sample_photo_base64, sample_transcript):
+        """Test that batch submission uploads one request line per item."""
+        openai_service.client.files.create = AsyncMock(return_value=Mock(id="file_123"))
+        openai_service.client.batches.create = AsyncMock(return_value=Mock(id="batch_123"))
+
+        batch_id = await openai_service.submit_story_batch({
+            "story-1": (sample_photo_base64, sample_transcript, "en"),
+            "story-2": (sample_photo_base64, sample_transcript, "fr"),
+        })
+
+        assert batch_id == "batch_123"
+        _, content = openai_service.client.files.create.call_args[1]["file"]
+        lines = [json.loads(line) for line in content.decode("utf-8").splitlines()]
+        assert [line["custom_id"] for line in lines] == ["story-1", "story-2"]
+        assert lines[0]["url"] == "/v1/chat/completions"
+        assert lines[0]["body"]["model"] == "gpt-4-vision-preview"
+        openai_service.client.batches.create.assert_called_once_with(
+            input_file_id="file_123",
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+
+    async def test_retrieve_batch_results_maps_custom_ids(self, openai_service, expected_openai_response):
+        """Test that batch output lines are parsed per custom_id."""
+        output_lines = [
+            {"custom_id": "ok", "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"content": json.dumps(expected_openai_response)}}]
+            }}},
+            {"custom_id": "failed", "response": {"status_code": 429, "body": {}}},
+        ]
+        openai_service.client.batches.retrieve = AsyncMock(
+            return_value=Mock(status="completed", output_file_id="file_out")
+        )
+        openai_service.client.files.content = AsyncMock(
+            return_value=Mock(text="\n".join(json.dumps(line) for line in output_lines))
+        )
+
+        results = await openai_service.retrieve_batch_results("batch_123")
+
+        assert results["ok"].enhanced_transcript == expected_openai_response["enhanced_transcript"]
+        assert isinstance(results["failed"], OpenAIError)
+
+    async def test_retrieve_batch_results_not_completed(self, openai_service):
+        """Test that unfinished batches raise OpenAIError."""
+        openai_service.client.batches.retrieve = AsyncMock(
+            return_value=Mock(status="in_progress", output_file_id=None)
+        )
+
+        with pytest.raises(OpenAIError, match="not completed"):
+            await openai_service.retrieve_batch_results("batch_123")
+
     def test_validate_inputs_success(self, openai_service, sample_photo_base64, sample_transcript):
         """Test input validation with valid inputs."""
         # Should not raise any exceptions
@@ -217,10 +384,17 @@ class TestOpenAIService:
 
     def test_build_prompt_with_transcript_and_language(self, openai_service, sample_transcript):
         """Test that prompt is built with transcript and language."""
+        template = PromptTemplate(
+            category="social",
+            name="story_enhancement",
+            version="1.0.0",
+            description="Test prompt",
+            last_updated="2024-09-08",
+            variables=["transcript", "language_name"],
+            template="Enhance {transcript} in {language_name}"
+        )
         with patch('app.services.openai_service.prompt_manager') as mock_pm:
-            mock_template = Mock()
-            mock_template.format.return_value = "Formatted prompt with transcript"
-            mock_pm.get_prompt.return_value = mock_template
+            mock_pm.get_prompt.return_value = template
 
             prompt = openai_service._build_prompt(
                 transcript=sample_transcript,
@@ -229,12 +403,26 @@ class TestOpenAIService:
 
             # Verify PromptManager was called correctly
             mock_pm.get_prompt.assert_called_once_with("social")
+            assert prompt.startswith(f"Enhance {sample_transcript} in English")
+            assert "JSON object containing 'enhanced_transcript' and 'insights'" in prompt
+
+    def test_build_prompt_reuses_rendered_language_parts(self, openai_service):
+        """Test that the template is rendered once per language and template."""
+        mock_template = Mock()
+        mock_template.format.return_value = f"Story: {_TRANSCRIPT_SENTINEL}."
+        with patch('app.services.openai_service.prompt_manager') as mock_pm, \
+             patch.dict('app.services.openai_service._prompt_parts_cache', clear=True):
+            mock_pm.get_prompt.return_value = mock_template
+
+            first = openai_service._build_prompt(transcript="one", language="fr")
+            second = openai_service._build_prompt(transcript="two", language="fr")
+
             mock_template.format.assert_called_once_with(
-                transcript=sample_transcript,
-                language_name="English"
+                transcript=_TRANSCRIPT_SENTINEL,
+                language_name="French"
             )
-            assert "Formatted prompt with transcript" in prompt
-            assert "JSON object containing 'enhanced_transcript' and 'insights'" in prompt
+            assert first.startswith("Story: one.")
+            assert second.startswith("Story: two.")
 
     def test_build_messages_for_vision_model(self, openai_service, sample_photo_base64, sample_transcript):
         """Test building messages for vision-capable model."""
@@ -256,7 +444,34 @@ class TestOpenAIService:
 
         # Check image content
         image_content = next(item for item in messages[0]["content"] if item["type"] == "image_url")
-        assert sample_photo_base64 in image_content["image_url"]["url"]
+        assert image_content["image_url"]["url"] == f"data:image/png;base64,{sample_photo_base64}"
+
+    def test_image_mime_type_defaults_to_jpeg(self, openai_service):
+        """Test that unrecognised image headers fall back to JPEG."""
+        jpeg = base64.b64encode(b"\xff\xd8\xff\xe0" + b"\x00" * 12).decode("utf-8")
+        unknown = base64.b64encode(b"not an image header").decode("utf-8")
+
+        assert openai_service._image_mime_type(jpeg) == "image/jpeg"
+        assert openai_service._image_mime_type(unknown) == "image/jpeg"
+
+    def test_validate_inputs_rejects_invalid_base64(self, openai_service, sample_transcript):
+        """Test that malformed base64 photo data is rejected before any API call."""
+        with pytest.raises(OpenAIError, match="not valid base64"):
+            openai_service._validate_inputs(
+                photo_base64="not*valid*base64",
+                transcript=sample_transcript,
+                language="en"
+            )
+
+    def test_validate_inputs_accepts_line_wrapped_base64(self, openai_service, sample_transcript):
+        """Test that MIME-style line-wrapped base64 is accepted, as GeminiService does."""
+        wrapped = base64.encodebytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 100).decode("ascii")
+
+        openai_service._validate_inputs(
+            photo_base64=wrapped,
+            transcript=sample_transcript,
+            language="en"
+        )
 
     def test_build_messages_for_text_model(self, openai_service, sample_photo_base64, sample_transcript):
         """Test building messages for text-only model."""
@@ -274,6 +489,26 @@ class TestOpenAIService:
         assert "cannot be analyzed with this model" in messages[0]["content"]
 
 
+    @pytest.mark.parametrize("response_text", [
+        '{"enhanced_transcript": "Story", "insights": {}}',
+        'Here you go: {"enhanced_transcript": "Story", "insights": {}} Enjoy!',
+        '```json\n{"enhanced_transcript": "Story", "insights": {}}\n```',
+        '```json\n{"enhanced_transcript": "Story", "insights": {}}\n``` {see above}',
+    ])
+    def test_extract_json_from_response_variants(self, openai_service, response_text):
+        """Test JSON extraction from bare, embedded and fenced responses."""
+        result = openai_service._extract_json_from_response(response_text)
+
+        assert result == {"enhanced_transcript": "Story", "insights": {}}
+
+    def test_extract_json_from_response_skips_regex_for_bare_json(self, openai_service):
+        """Test that JSON mode responses never reach the regex fallback."""
+        with patch('app.services.openai_service._FENCED_JSON_RE') as mock_re:
+            openai_service._extract_json_from_response('{"enhanced_transcript": "Story", "insights": {}}')
+
+        mock_re.search.assert_not_called()
+
+
 @pytest.mark.unit
 class TestOpenAIError:
     """Test OpenAIError exception class."""
@@ -6,7 +6,9 @@ import tempfile
 import os
 from pathlib import Path
 from unittest.mock import patch, mock_open
-from app.services.prompt_manager import PromptManager, PromptTemplate, PromptManagerError
+from app.services.prompt_manager import (
+    PromptManager, PromptTemplate, PromptManagerError, STAT_CHECK_INTERVAL_SECONDS
+)
 
 
 @pytest.mark.unit
@@ -64,6 +66,52 @@ class TestPromptTemplate:
             template.format(name="Alice")  # Missing 'greeting'
 
 
+    def test_prompt_template_format_escaped_braces(self):
+        """Test that escaped braces render like str.format."""
+        template = PromptTemplate(
+            category="test",
+            name="test_prompt",
+            version="1.0.0",
+            description="Test prompt",
+            last_updated="2024-09-08",
+            variables=["name"],
+            template='Reply as {{"name": "{name}"}}'
+        )
+        
+        assert template.format(name="Alice") == 'Reply as {"name": "Alice"}'
+    
+    def test_prompt_template_undeclared_variable_rejected_at_load(self):
+        """Test that placeholders must be declared in variables."""
+        with pytest.raises(ValueError, match="undeclared variable: greeting"):
+            PromptTemplate(
+                category="test",
+                name="test_prompt",
+                version="1.0.0",
+                description="Test prompt",
+                last_updated="2024-09-08",
+                variables=["name"],
+                template="Hello {name}! {greeting}"
+            )
+    
+    def test_prompt_template_memoizes_rendered_prompts(self):
+        """Test that repeated formats reuse the rendered prompt."""
+        template = PromptTemplate(
+            category="test",
+            name="test_prompt",
+            version="1.0.0",
+            description="Test prompt",
+            last_updated="2024-09-08",
+            variables=["name"],
+            template="Hello {name}!"
+        )
+        
+        assert template.format(name="Alice") == "Hello Alice!"
+        assert template.format(name="Alice") == "Hello Alice!"
+        assert template._render_cached.cache_info().hits == 1
+        # Unhashable values bypass the cache instead of failing
+        assert template.format(name=["Bob"]) == "Hello ['Bob']!"
+
+
 @pytest.mark.unit
 class TestPromptManager:
     """Test PromptManager functionality."""
@@ -215,11 +263,20 @@ template: |
         with pytest.raises(PromptManagerError, match="Failed to reload prompts"):
             PromptManager(prompts_dir=str(temp_prompts_dir))
     
+    def test_prompt_file_rejects_unsafe_yaml_tags(self, temp_prompts_dir):
+        """Test that the (C) loader stays a safe loader."""
+        (temp_prompts_dir / "social.yaml").write_text("!!python/object/apply:os.getcwd []\n")
+        
+        with pytest.raises(PromptManagerError, match="Failed to reload prompts"):
+            PromptManager(prompts_dir=str(temp_prompts_dir))
+    
+    @patch('app.services.prompt_manager.time.monotonic')
     @patch('app.services.prompt_manager.os.path.getmtime')
-    def test_hot_reload_detection(self, mock_getmtime, temp_prompts_dir):
+    def test_hot_reload_detection(self, mock_getmtime, mock_monotonic, temp_prompts_dir):
         """Test hot reload file modification detection."""
         # Mock file modification times - need more values for all the getmtime calls
         mock_getmtime.return_value = 1000  # Initial loading
+        mock_monotonic.return_value = 100.0
         
         with patch.object(PromptManager, '_is_hot_reload_enabled', return_value=True):
             manager = PromptManager(prompts_dir=str(temp_prompts_dir))
@@ -229,6 +286,7 @@ template: |
             
             # Change the mock to return newer time for reload detection
             mock_getmtime.return_value = 1001
+            mock_monotonic.return_value = 100.0 + STAT_CHECK_INTERVAL_SECONDS + 1
             
             # Second call - should trigger reload due to newer mtime
             with patch.object(manager, '_load_prompt_file') as mock_load:
@@ -236,6 +294,44 @@ template: |
                 prompt2 = manager.get_prompt("social")
                 mock_load.assert_called_once()
     
+    @patch('app.services.prompt_manager.time.monotonic')
+    @patch('app.services.prompt_manager.os.path.getmtime')
+    def test_hot_reload_stat_is_rate_limited(self, mock_getmtime, mock_monotonic, temp_prompts_dir):
+        """Test that prompt files are not stat'ed on every get_prompt call."""
+        mock_getmtime.return_value = 1000
+        mock_monotonic.return_value = 100.0
+        
+        with patch.object(PromptManager, '_is_hot_reload_enabled', return_value=True):
+            manager = PromptManager(prompts_dir=str(temp_prompts_dir))
+            mock_getmtime.reset_mock()
+            
+            for _ in range(5):
+                manager.get_prompt("social")
+            
+            mock_getmtime.assert_not_called()
+    
+    def test_get_prompt_without_hot_reload_is_cache_lookup(self, temp_prompts_dir):
+        """Test that get_prompt skips reload checks when hot reload is off."""
+        with patch.object(PromptManager, '_is_hot_reload_enabled', return_value=False):
+            manager = PromptManager(prompts_dir=str(temp_prompts_dir))
+        
+        with patch.object(manager, '_should_reload') as mock_should_reload:
+            prompt = manager.get_prompt("social")
+            
+            assert prompt is manager._prompt_cache["social"]
+            mock_should_reload.assert_not_called()
+        
+        with pytest.raises(PromptManagerError, match="Unknown category"):
+            manager.get_prompt("nonexistent")
+    
+    def test_hot_reload_disabled_outside_debug(self, temp_prompts_dir):
+        """Test that hot reload is off when debug mode is off."""
+        manager = PromptManager(prompts_dir=str(temp_prompts_dir))
+        
+        with patch('app.services.prompt_manager.settings') as mock_settings:
+            mock_settings.debug = False
+            assert manager._is_hot_reload_enabled() is False
+    
     def test_reload_prompts_manually(self, temp_prompts_dir):
         """Test manual prompt reloading."""
         manager = PromptManager(prompts_dir=str(temp_prompts_dir))
@@ -0,0 +1,131 @@
+"""
+Unit tests for Text-to-Speech service.
+"""
+import base64
+import httpx
+import openai
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.services.tts_service import TTSService, TTSError, TTSRateLimitError
+
+
+def _openai_status_error(error_class, status_code, code=None):
+    """Build an OpenAI SDK status error as the client would raise it."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/audio/speech")
+    response = httpx.Response(status_code, request=request)
+    return error_class("rejected", response=response, body={"code": code})
+
+
+@pytest.mark.unit
+class TestTTSService:
+    """Test TTS service functionality."""
+
+    @pytest.fixture
+    def tts_service(self):
+        """Create TTSService without provider clients."""
+        service = TTSService()
+        service.openai_client = None
+        service.elevenlabs_client = None
+        return service
+
+    async def test_elevenlabs_audio_joins_streamed_chunks(self, tts_service):
+        """Test that streamed ElevenLabs chunks are assembled in order."""
+        async def audio_chunks():
+            for chunk in (b"ID3", b"\x00\x01", b"\xff\xfb"):
+                yield chunk
+
+        tts_service.elevenlabs_client = Mock()
+        tts_service.elevenlabs_client.text_to_speech.convert.return_value = audio_chunks()
+
+        audio_base64, audio_format = await tts_service._generate_elevenlabs_audio("Hello", "en")
+
+        assert base64.b64decode(audio_base64) == b"ID3\x00\x01\xff\xfb"
+        assert audio_format == "mp3"
+
+    async def test_generate_audio_requires_text(self, tts_service):
+        """Test that empty text is rejected."""
+        with pytest.raises(TTSError, match="Text content is required"):
+            await tts_service.generate_audio("   ")
+
+    async def test_stream_audio_yields_elevenlabs_chunks(self, tts_service):
+        """Test that streamed audio is passed through chunk by chunk."""
+        async def audio_chunks():
+            for chunk in (b"ID3", b"\xff\xfb"):
+                yield chunk
+
+        tts_service.elevenlabs_client = Mock()
+        tts_service.elevenlabs_client.text_to_speech.convert.return_value = audio_chunks()
+
+        with patch('app.services.tts_service.settings') as mock_settings:
+            mock_settings.tts_provider = "elevenlabs"
+            chunks = [chunk async for chunk in tts_service.stream_audio("Hello", "en")]
+
+        assert chunks == [b"ID3", b"\xff\xfb"]
+
+    async def test_stream_audio_wraps_provider_errors(self, tts_service):
+        """Test that provider failures during streaming raise TTSError."""
+        tts_service.elevenlabs_client = Mock()
+        tts_service.elevenlabs_client.text_to_speech.convert.side_effect = Exception("boom")
+
+        with patch('app.services.tts_service.settings') as mock_settings:
+            mock_settings.tts_provider = "elevenlabs"
+            with pytest.raises(TTSError, match="TTS streaming failed"):
+                async for _ in tts_service.stream_audio("Hello", "en"):
+                    pass
+
+    @pytest.mark.parametrize("code,message", [
+        (None, "rate limit exceeded"),
+        ("insufficient_quota", "quota exceeded"),
+    ])
+    async def test_openai_rate_limit_raises_typed_error(self, tts_service, code, message):
+        """Test that OpenAI 429s map to TTSRateLimitError by type, not message text."""
+        tts_service.openai_client = Mock()
+        tts_service.openai_client.audio.speech.create = AsyncMock(
+            side_effect=_openai_status_error(openai.RateLimitError, 429, code)
+        )
+
+        with pytest.raises(TTSRateLimitError, match=message):
+            await tts_service._generate_openai_audio("Hello", "en")
+
+    async def test_openai_error_mentioning_limit_is_not_rate_limited(self, tts_service):
+        """Test that untyped errors are not classified by their wording."""
+        tts_service.openai_client = Mock()
+        tts_service.openai_client.audio.speech.create = AsyncMock(
+            side_effect=Exception("input exceeds character limit")
+        )
+
+        with pytest.raises(TTSError, match="OpenAI TTS generation failed") as exc_info:
+            await tts_service._generate_openai_audio("Hello", "en")
+        assert not isinstance(exc_info.value, TTSRateLimitError)
+
+    async def test_elevenlabs_429_raises_typed_error(self, tts_service):
+        """Test that ElevenLabs errors are classified by HTTP status."""
+        error = Exception("Too Many Requests")
+        error.status_code = 429
+        tts_service.elevenlabs_client = Mock()
+        tts_service.elevenlabs_client.text_to_speech.convert.side_effect = error
+
+        with pytest.raises(TTSRateLimitError):
+            await tts_service._generate_elevenlabs_audio("Hello", "en")
+
+    def test_voice_lookups_fall_back_to_defaults(self, tts_service):
+        """Test that unknown voices and languages resolve to the default voices."""
+        with patch('app.services.tts_service.settings') as mock_settings:
+            mock_settings.tts_voice = None
+            assert tts_service._get_openai_voice("nova") == "nova"
+            assert tts_service._get_openai_voice("robot") == "alloy"
+
+        assert tts_service._get_elevenlabs_voice("ES") == "VR6AewLTigWG4xSOukaG"
+        assert tts_service._get_elevenlabs_voice("xx") == "21m00Tcm4TlvDq8ikWAM"
+
+    async def test_mock_audio_returns_silent_mp3_frame(self, tts_service):
+        """Test that mock audio is a valid MP3 frame in both base64 and streamed form."""
+        audio_base64, audio_format = await tts_service._generate_mock_audio("Hello", "en")
+
+        with patch('app.services.tts_service.settings') as mock_settings:
+            mock_settings.tts_provider = "mock"
+            chunks = [chunk async for chunk in tts_service.stream_audio("Hello", "en")]
+
+        assert audio_format == "mp3"
+        assert base64.b64decode(audio_base64)[:2] == b"\xff\xfb"
+        assert chunks == [base64.b64decode(audio_base64)]